@@ -1,11 +1,16 @@
 import streamlit as st
-import asyncio
 
 from agents import trace, InputGuardrailTripwireTriggered
-from finance_agents.planner_executor_agent import run_planner_agent, run_executor_agent
+from finance_agents.planner_executor_agent import run_query_pipeline
+from utils.pipeline_cache import pipeline_cache
+from utils.usage_budget import track_usage
+from utils import async_runtime
 from schemas.finance_app import TextOnlyOutput, AnalysisWithPlotOutput, GeneralizedOutput
 from utils.display_functions import *
 from utils.config import setup_openai_api_key, setup_sectors_api_key  # Ensure config is loaded to set up API keys
+from utils.cache_warmup import start_cache_warmup
+from utils.response_cache import start_cache_purge
+from utils.metrics import install_metrics
 import logging
 
 setup_openai_api_key()  # Set up OpenAI API key
@@ -21,9 +26,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+start_cache_warmup()  # Prefetch popular Sectors data once per process
+start_cache_purge()  # Drop expired Sectors responses from the shared cache file
+install_metrics()  # Per-stage metrics, served on METRICS_PORT when set
+
+async def answer_query(user_input: str, emit, direct_execution: bool, stream_responses: bool):
+    """Run the query pipeline on the background runtime; progress goes to emit for the script thread to render."""
+    with trace("Finance Agents Workflow"), track_usage() as usage:
+        output = await run_query_pipeline(user_input, emit, direct_execution, stream_responses)
+    emit(("usage", usage.as_dict()))
+    return output
+
 def main():
     set_title()
     set_sidebar()
+    display_streaming_toggle()
+    display_execution_mode_toggle()
     initialize_session_state()  # Initialize session state variables
     display_example_queries()  # Display example queries as selectable pills
     user_input = display_user_input_area()  # Display text area for user input
@@ -33,45 +51,44 @@ def main():
 
     if st.session_state.run_query and st.session_state.user_input.strip():
         with st.spinner("Thinking...", show_time=True):
+            view = None
+            usage = None
             try:
                 logger.info(f"User query received: {st.session_state.user_input}")
-                with trace("Finance Agents Workflow"):
-                    logger.info("Running planner agent...")
-                    planner_result = asyncio.run(run_planner_agent(user_input))
-                    logger.info("Planner agent response received.")
-                    if planner_result.execute_steps:
-                        logger.info("Executing steps with executor agent...")
-                        logger.info(f"User query: {planner_result.user_query}")
-                        logger.info(f"Steps to execute: {planner_result.steps}")
-
-                        # Assume planner_result.steps is a list of step descriptions
-                        steps_text = "\n".join(planner_result.steps) if isinstance(planner_result.steps, list) else str(planner_result.steps)
+                direct_execution = st.session_state.direct_execution
+                stream_responses = st.session_state.stream_responses
 
+                # Repeated and concurrent identical queries share one pipeline run per Sectors data version.
+                # The pipeline runs on the process-wide async runtime, this thread only renders.
+                background = async_runtime.start(lambda emit: pipeline_cache.get_or_run(
+                    user_input, lambda: answer_query(user_input, emit, direct_execution, stream_responses)
+                ))
+                for kind, payload in background.events():
+                    if kind == "steps":
                         st.info(
                             f"""
                             Executing steps with executor agent...
                             Steps to execute:
-                            {steps_text}
+                            {payload}
                             """
                         )
-
-                        # Run the executor agent with the steps from the planner agent
-                        executor_input = f"User query: {planner_result.user_query}\nSteps to execute: {planner_result.steps}"
-                        executor_result = asyncio.run(run_executor_agent(executor_input))
-                        if isinstance(executor_result, GeneralizedOutput):
-                            display_agent_response_title()
-                            st.write(executor_result.summary)
-                            if executor_result.plot_data:
-                                display_analysis_with_plot_output(executor_result.plot_data)
-                        else:
+                    elif kind == "stream":
+                        # Summary is rendered while it is generated, plots once the output is complete
+                        if view is None:
                             display_agent_response_title()
-                            st.write(executor_result)
-                        logger.info("Executor agent response displayed.")
-                    else:
-                        logger.info("Planner agent decided not to execute steps.")
-                        logger.info(f"Reason: {planner_result.reason}")
-                        display_agent_response_title()
-                        st.write(planner_result.reason)
+                            view = StreamedResponseView()
+                        view.update(payload)
+                    elif kind == "usage":
+                        usage = payload
+
+                output = background.result()
+                if view is not None:
+                    view.complete(output)
+                else:
+                    display_final_output(output)
+                if usage is not None:  # None when the answer came from the cache
+                    display_usage(usage)
+                logger.info("Agent response displayed.")
             
             # Handle input guardrails
             except InputGuardrailTripwireTriggered as e:
@@ -83,6 +100,8 @@ def main():
             
             # Handle other exceptions
             except Exception as e:
+                if view is not None:
+                    view.fail()
                 logger.error(f"Error during agent execution: {e}", exc_info=True)
                 st.info("Please try again or try a different query.")
 
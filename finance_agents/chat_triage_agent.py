@@ -1,10 +1,15 @@
-from agents import Agent, Runner
+from agents import Agent, MaxTurnsExceeded, RunResultStreaming
 
 from datetime import date
 from dataclasses import dataclass
 from typing import Literal
 
 from finance_agents.orchestrator_agent import orchestrator_agent
+from utils.usage_budget import BudgetExceeded, partial_output, run_agent, run_agent_streamed
+
+import logging
+
+logger = logging.getLogger(__name__)
 
 chat_triage_agent = Agent(
     name="Chat Triage Agent",
@@ -23,11 +28,21 @@ chat_triage_agent = Agent(
 )
 
 async def run_chat_triage_agent(input_promt: str):
-    result = await Runner.run(
+    try:
+        result = await run_agent(
+            chat_triage_agent,
+            input_promt
+        )
+    except (BudgetExceeded, MaxTurnsExceeded) as e:
+        logger.warning(f"Chat triage stopped early: {e}")
+        return partial_output(e)
+    return result.final_output
+
+async def run_chat_triage_agent_streamed(input_promt) -> RunResultStreaming:
+    return run_agent_streamed(
         chat_triage_agent,
         input_promt
     )
-    return result.final_output
 
 if __name__ == "__main__":
     import asyncio
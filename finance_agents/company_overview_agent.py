@@ -2,20 +2,27 @@ from agents import Agent, Runner, function_tool
 from dotenv import load_dotenv
 
 from schemas.finance_app import TextOnlyOutput
-from utils.api_client import retrieve_from_endpoint
+from utils.api_client import aretrieve_from_endpoint
+from utils.config import SECTORS_BASE_URL
+from utils.payload_projection import project
+from utils.ticker_index import ticker_index
 import logging
 
 logger = logging.getLogger(__name__)
 
 @function_tool
-def get_company_overview(ticker: str) -> str:
+async def get_company_overview(ticker: str) -> str:
     """
     Get company overview only from IDX
     """
-    url = f"https://api.sectors.app/v1/company/report/{ticker}/?sections=overview"
+    symbol = ticker_index.resolve(ticker)
+    if symbol is None:
+        return {"error": f"'{ticker}' is not a known IDX ticker or company name."}
+    ticker = symbol
+    url = f"{SECTORS_BASE_URL}/company/report/{ticker}/?sections=overview"
 
     try:
-        return retrieve_from_endpoint(url)
+        return project("get_company_overview", await aretrieve_from_endpoint(url))
     except Exception as e:
         logger.error(f"Error retrieving company overview for {ticker}: {e}")
         print(f"Error retrieving company overview for {ticker}: {e}")
@@ -4,13 +4,20 @@ from agents import (
     GuardrailFunctionOutput,
     InputGuardrailTripwireTriggered,
     RunContextWrapper,
-    Runner,
     TResponseInputItem,
     input_guardrail,
     WebSearchTool
 )
 
 from schemas.finance_app import GuardrailViolationInfo
+from utils.idx_classifier import classify_query, normalize_query, verdict_cache
+from utils.single_flight import SingleFlight
+from utils.usage_budget import budget_stop, run_agent
+from utils import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Guardrail 1: Check if the query is related to IDX-listed companies only
 class IDXOnlyQuery(BaseModel):
@@ -35,22 +42,67 @@ query_analysis_agent = Agent(
     model="gpt-4o-mini",  # Use a smaller model for efficiency
 )
 
+# Concurrent guardrail runs for the same query share one LLM call; a budget stop is not shared
+_verdict_single_flight = SingleFlight("idx_guardrail", private=lambda e: budget_stop(e) is not None)
+
+def _user_texts(input) -> list:
+    """Return the user messages of a guardrail input, a plain query or a list of chat items."""
+    if isinstance(input, str):
+        return [input]
+    texts = []
+    for item in input:
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            if isinstance(content, list):  # content parts
+                content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            texts.append(str(content))
+    return texts
+
+async def _classify_with_llm(ctx, input, cache_key: str) -> tuple:
+    result = await run_agent(
+        query_analysis_agent,
+        input=input,
+        context=ctx.context
+    )
+    verdict = (result.final_output.is_idx_only_query, result.final_output.reasoning)
+    verdict_cache.set(cache_key, verdict)
+    return verdict
+
 @input_guardrail
 async def idx_only_query_guardrail(ctx, agent, input) -> GuardrailFunctionOutput:
     """
     Guardrail to ensure that the query is related to IDX-listed companies only.
+    Clear cases are decided by the local classifier; ambiguous ones go to the LLM,
+    whose verdicts are cached on the normalized conversation. The classifier only sees the
+    last message, so in a conversation its blocks go to the LLM too: a follow-up may be about
+    the company discussed earlier without naming it.
     """
-    result = await Runner.run(
-        query_analysis_agent,
-        input=input,
-        context=ctx.context
-    )
-    tripwire = not result.final_output.is_idx_only_query
+    texts = _user_texts(input)
+    local = classify_query(texts[-1] if texts else "")
+    if local.decision == "allow" or local.decision == "block" and len(texts) <= 1:
+        is_idx_only_query, reasoning = local.decision == "allow", local.reason
+        logger.info(f"IDX guardrail decided locally: {local.decision} (score {local.score})")
+        metrics.cache_requests_total.inc(cache="guardrail_verdict", result="local")
+    else:
+        # Follow-up questions depend on the earlier turns, so the whole conversation is the key
+        cache_key = "\n".join(texts)
+        cached = verdict_cache.get(cache_key)
+        if cached is not None:
+            is_idx_only_query, reasoning = cached
+            logger.info("IDX guardrail verdict cache hit")
+            metrics.cache_requests_total.inc(cache="guardrail_verdict", result="hit")
+        else:
+            metrics.cache_requests_total.inc(cache="guardrail_verdict", result="miss")
+            is_idx_only_query, reasoning = await _verdict_single_flight.do(
+                normalize_query(cache_key), lambda: _classify_with_llm(ctx, input, cache_key)
+            )
+
+    tripwire = not is_idx_only_query
     return GuardrailFunctionOutput(
         output_info=GuardrailViolationInfo(
             guardrail="IDX Only Query Guardrail",
             violated=tripwire,
-            reason=result.final_output.reasoning,
+            reason=reasoning,
             details=f"Query: {input}" if tripwire else ""
         ), 
         tripwire_triggered=tripwire
@@ -1,16 +1,19 @@
-from agents import Agent, Runner, function_tool
+from agents import Agent, MaxTurnsExceeded, RunResultStreaming, function_tool
 
 from datetime import date
 from dataclasses import dataclass
 from typing import Literal
 
-from finance_agents.company_overview_agent import company_overview_agent
-from finance_agents.trend_analysis_agent import trend_analysis_agent
-from finance_agents.top_companies_list_agent import top_company_ranked_agent
+from finance_agents.sub_agents import company_overview, company_daily_transaction, top_companies_ranked
 
 from finance_agents.input_guardrails import idx_only_query_guardrail, compliance_guardrail
 
 from schemas.finance_app import GeneralizedOutput
+from utils.usage_budget import BudgetExceeded, partial_output, run_agent, run_agent_streamed
+
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Define agent as a tool to get company overview
 @function_tool
@@ -21,13 +24,7 @@ async def get_company_overview(ticker: str) -> str:
     Args:
         ticker (str): The stock ticker of the company.
     """
-
-    agent = company_overview_agent
-    result = await Runner.run(
-        agent,
-        f"Provide a summary overview for the company with ticker {ticker}."
-    )
-    return result.final_output
+    return await company_overview(ticker)
 
 # Define agent as a tool to get daily transaction analysis
 @function_tool
@@ -40,13 +37,7 @@ async def get_company_daily_transaction(ticker: str, metrics: str, date_period:
         metrics (str): The metrics to analyze, such as "volume" or "price".
         date_period (str): The date range for the analysis as in the user query.
     """
-
-    agent = trend_analysis_agent
-    result = await Runner.run(
-        agent,
-        f"Analyze {metrics} for {ticker} in the time period {date_period}."
-    )
-    return result.final_output
+    return await company_daily_transaction(ticker, metrics, date_period)
 
 # Define agent as a tool to get top companies ranked by market cap
 @function_tool
@@ -67,13 +58,7 @@ async def get_top_companies_ranked(
         n (int): The number of top companies to retrieve.
         sort_by: The criteria to sort the companies.
     """
-
-    agent = top_company_ranked_agent
-    result = await Runner.run(
-        agent,
-        f"Provide a list of the top {n} companies ranked by {sort_by} in year {year}."
-    )
-    return result.final_output
+    return await top_companies_ranked(n, sort_by, year)
 
 # Define the orchestrator agent that uses the above tools
 orchestrator_agent = Agent(
@@ -99,11 +84,22 @@ orchestrator_agent = Agent(
 )
 
 async def run_orchestrator_agent(input_promt: str) -> GeneralizedOutput:
-    result = await Runner.run(
+    try:
+        result = await run_agent(
+            orchestrator_agent,
+            input_promt
+        )
+    except (BudgetExceeded, MaxTurnsExceeded) as e:
+        # Answer with what the tools returned so far instead of running on
+        logger.warning(f"Orchestrator stopped early: {e}")
+        return partial_output(e)
+    return result.final_output
+
+async def run_orchestrator_agent_streamed(input_promt: str) -> RunResultStreaming:
+    return run_agent_streamed(
         orchestrator_agent,
         input_promt
     )
-    return result.final_output
 
 if __name__ == "__main__":
     import asyncio
@@ -1,16 +1,32 @@
-from agents import Agent, Runner, function_tool
+from agents import Agent, RunResultStreaming, function_tool
 
+import time
 from datetime import date
 from dataclasses import dataclass
-from typing import Literal
+from typing import Dict, Literal, Optional
 
-from finance_agents.company_overview_agent import company_overview_agent
-from finance_agents.trend_analysis_agent import trend_analysis_agent
-from finance_agents.top_companies_list_agent import top_company_ranked_agent
+from finance_agents.sub_agents import company_overview, company_daily_transaction, top_companies_ranked
 
 from finance_agents.input_guardrails import idx_only_query_guardrail, compliance_guardrail
 
-from schemas.finance_app import GeneralizedOutput, PlannerOutput
+from schemas.finance_app import GeneralizedOutput, PlannerOutput, TextOnlyOutput
+from utils.plan_executor import PlanValidationError, StepResult, collect_plot_data, execute_plan, format_plan_results
+from utils.streaming import forward_stream_updates
+from utils import metrics
+from utils.model_router import Complexity, score_query
+from utils.pipeline_cache import mark_incomplete
+from utils.usage_budget import budget_stop, current_usage, partial_output, run_agent, run_agent_streamed
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Coroutine per plan tool name, used to execute PlannerOutput.plan
+PLAN_DISPATCH = {
+    "get_company_overview": company_overview,
+    "get_company_daily_transaction": company_daily_transaction,
+    "get_top_companies_ranked": top_companies_ranked,
+}
 
 # Define agent as a tool to get company overview
 @function_tool
@@ -21,13 +37,7 @@ async def get_company_overview(ticker: str) -> str:
     Args:
         ticker (str): The stock ticker of the company.
     """
-
-    agent = company_overview_agent
-    result = await Runner.run(
-        agent,
-        f"Provide a summary overview for the company with ticker {ticker}."
-    )
-    return result.final_output
+    return await company_overview(ticker)
 
 # Define agent as a tool to get daily transaction analysis
 @function_tool
@@ -40,13 +50,7 @@ async def get_company_daily_transaction(ticker: str, metrics: str, date_period:
         metrics (str): The metrics to analyze, such as "volume" or "price".
         date_period (str): The date range for the analysis as in the user query.
     """
-
-    agent = trend_analysis_agent
-    result = await Runner.run(
-        agent,
-        f"Analyze {metrics} for {ticker} in the time period {date_period}."
-    )
-    return result.final_output
+    return await company_daily_transaction(ticker, metrics, date_period)
 
 # Define agent as a tool to get top companies ranked by market cap
 @function_tool
@@ -67,13 +71,7 @@ async def get_top_companies_ranked(
         n (int): The number of top companies to retrieve.
         sort_by: The criteria to sort the companies.
     """
-
-    agent = top_company_ranked_agent
-    result = await Runner.run(
-        agent,
-        f"Provide a list of the top {n} companies ranked by {sort_by} in year {year}."
-    )
-    return result.final_output
+    return await top_companies_ranked(n, sort_by, year)
 
 # Define the planner agent to break down user queries into actionable steps
 planner_instructions = (
@@ -85,7 +83,15 @@ planner_instructions = (
     "Example output: " \
     "Step 1: Call get_top_companies_ranked to return top 3 companies by market cap in 2024" \
     "Step 2: For each company ticker returned in Step 1, call get_company_overview with tickers from step 1." \
-    "Step 3: Combine the summaries from Step 2 into a final report."  
+    "Step 3: Combine the summaries from Step 2 into a final report.  " \
+    "Also return the tool invocations as `plan`, a dependency graph: one entry per invocation with a unique id, " \
+    "the tool and its typed arguments in `call`, and in `depends_on` the ids of the steps whose results it needs. " \
+    "Steps that do not need each other's results must not depend on each other, they run in parallel. " \
+    "When a step has to run for every company returned by another step, set `for_each_ticker_from` to that step's id " \
+    "and use a placeholder ticker. Do not add a step for combining the results, that is done afterwards. " \
+    "For the example above: s1 = get_top_companies_ranked(n=3, sort_by='market_cap', year=2024), " \
+    "s2 = get_company_overview(ticker='-') with depends_on ['s1'] and for_each_ticker_from 's1'. " \
+    "Set `plan` to null when no steps should be executed."
 )
 
 planner_agent = Agent(
@@ -113,7 +119,7 @@ async def run_planner_agent(input_promt: str) -> PlannerOutput:
     Returns:
         PlannerOutput: The output containing the steps to execute.
     """
-    result = await Runner.run(
+    result = await run_agent(
         planner_agent,
         input_promt
     )
@@ -126,7 +132,8 @@ executor_instructions = (
     "You must rely exclusively on the available tools to answer the query — do not generate responses independently. "
     f"The current date is {date.today()}. "
     "All responses must strictly follow the GeneralizedOutput schema. Do not generate or return images for charts or visualizations. "
-    "If multiple tools are used, provide a clear and concise summary of their combined outputs."
+    "If multiple tools are used, provide a clear and concise summary of their combined outputs. " \
+    "If results of already executed steps are provided, answer from them and only call tools for information that is still missing."
 )
 
 executor_agent = Agent(
@@ -140,22 +147,214 @@ executor_agent = Agent(
     output_type=GeneralizedOutput
 )
 
-async def run_executor_agent(input_promt: PlannerOutput) -> GeneralizedOutput:
+async def run_executor_agent(input_promt: PlannerOutput, complexity: Optional[Complexity] = None) -> GeneralizedOutput:
     """
     Run the executor agent to execute the steps generated by the planner agent.
 
     Args:
         input_promt (PlannerOutput): The output from the planner agent containing the steps to execute.
+        complexity (Complexity): Optional complexity of the query, used to pick the model tier.
     
     Returns:
         GeneralizedOutput: The final output after executing the steps.
     """
-    result = await Runner.run(
+    result = await run_agent(
         executor_agent,
-        input_promt
+        input_promt,
+        complexity=complexity
     )
     return result.final_output
 
+async def run_executor_agent_streamed(input_promt: str, complexity: Optional[Complexity] = None) -> RunResultStreaming:
+    """
+    Start the executor agent in streaming mode.
+
+    Args:
+        input_promt (str): The user query and the steps from the planner agent.
+        complexity (Complexity): Optional complexity of the query, used to pick the model tier.
+
+    Returns:
+        RunResultStreaming: The streamed run, consume it with stream_events().
+    """
+    return run_agent_streamed(
+        executor_agent,
+        input_promt,
+        complexity=complexity
+    )
+
+async def run_plan(planner_output: PlannerOutput, emit=None) -> Optional[Dict[str, StepResult]]:
+    """
+    Run the planner's dependency graph of tool invocations.
+
+    Args:
+        planner_output (PlannerOutput): The output from the planner agent.
+        emit: Optional callback called with a StreamUpdate as each tool invocation starts and ends.
+
+    Returns:
+        Optional[Dict[str, StepResult]]: The result of each step, or None when there is no valid graph.
+    """
+    if not planner_output.plan:
+        return None
+    try:
+        return await execute_plan(planner_output.plan, PLAN_DISPATCH, emit=emit)
+    except PlanValidationError as e:
+        # An invalid graph leaves the steps to the executor agent, as before
+        logger.warning(f"Plan graph not executed: {e}")
+        return None
+
+def build_executor_input(planner_output: PlannerOutput, results: Optional[Dict[str, StepResult]] = None) -> str:
+    """Build the executor agent prompt from the planner output and the results of the executed steps, if any."""
+    executor_input = f"User query: {planner_output.user_query}\nSteps to execute: {planner_output.steps}"
+    if results is None:
+        return executor_input
+    return f"{executor_input}\nResults of executed steps:\n{format_plan_results(results)}"
+
+# Define the synthesizer agent to write the final answer when the planned steps were executed directly
+synthesizer_instructions = (
+    "Your task is to answer the user's query from the results of the steps that were already executed for it. "
+    "Use only the facts and numbers in those results, do not make up any data. "
+    f"The current date is {date.today()}. "
+    "The charts produced by the steps are shown together with your answer, refer to them where helpful "
+    "but do not list their data points. "
+    "If a step failed or returned no data, say which information is missing. "
+    "Provide a clear and concise summary of the combined results."
+)
+
+synthesizer_agent = Agent(
+    name="Synthesizer Agent",
+    instructions=synthesizer_instructions,
+    output_type=TextOnlyOutput
+)
+
+def build_synthesizer_input(planner_output: PlannerOutput, results: Dict[str, StepResult]) -> str:
+    """Build the synthesizer prompt; chart data is left out since the charts are attached as they are."""
+    return f"User query: {planner_output.user_query}\nResults of executed steps:\n{format_plan_results(results, include_plot_data=False)}"
+
+async def run_synthesizer_agent(planner_output: PlannerOutput, results: Dict[str, StepResult]) -> GeneralizedOutput:
+    """
+    Write the final answer for directly executed steps with a single LLM call.
+
+    Args:
+        planner_output (PlannerOutput): The output from the planner agent.
+        results (Dict[str, StepResult]): The results of run_plan.
+
+    Returns:
+        GeneralizedOutput: The summary of the synthesizer agent with the charts of the steps.
+    """
+    result = await run_agent(
+        synthesizer_agent,
+        build_synthesizer_input(planner_output, results),
+        final=True,
+        complexity=score_query(planner_output.user_query, planner_output.plan)
+    )
+    return GeneralizedOutput(summary=result.final_output.summary, plot_data=collect_plot_data(results) or None)
+
+async def run_synthesizer_agent_streamed(planner_output: PlannerOutput, results: Dict[str, StepResult]) -> RunResultStreaming:
+    """
+    Start the synthesizer agent in streaming mode. Its output has no charts, take them from collect_plot_data(results).
+
+    Args:
+        planner_output (PlannerOutput): The output from the planner agent.
+        results (Dict[str, StepResult]): The results of run_plan.
+
+    Returns:
+        RunResultStreaming: The streamed run, consume it with stream_events().
+    """
+    return run_agent_streamed(
+        synthesizer_agent,
+        build_synthesizer_input(planner_output, results),
+        final=True,
+        complexity=score_query(planner_output.user_query, planner_output.plan)
+    )
+
+async def run_query_pipeline(user_query: str, emit=None, direct_execution: bool = True, stream_responses: bool = False,
+                             timings: Optional[Dict[str, float]] = None):
+    """
+    Answer a query with the planner, the plan graph runtime and the synthesizer or executor agent.
+
+    Args:
+        user_query (str): The user query to answer.
+        emit: Optional callback for progress, called with ("steps", text) and, when streaming, ("stream", StreamUpdate)
+            for the tool calls of the plan as they happen and for the final agent run.
+        direct_execution (bool): Answer from the executed plan with a single synthesis call instead of the executor agent.
+        stream_responses (bool): Stream the final agent run through emit.
+        timings (Dict[str, float]): Optional dict filled with the duration of each stage in seconds.
+
+    Returns:
+        The final GeneralizedOutput, or the planner's reason when no steps are executed.
+    """
+    emit = emit or (lambda event: None)
+    timings = {} if timings is None else timings
+
+    def forward(update):
+        emit(("stream", update))
+
+    def record(stage: str, started: float):
+        timings[stage] = time.perf_counter() - started
+        metrics.pipeline_stage_seconds.observe(timings[stage], stage=stage)
+
+    started = time.perf_counter()
+    logger.info("Running planner agent...")
+    planner_result = await run_planner_agent(user_query)
+    record("planner", started)
+    logger.info("Planner agent response received.")
+    if not planner_result.execute_steps:
+        logger.info("Planner agent decided not to execute steps.")
+        logger.info(f"Reason: {planner_result.reason}")
+        return planner_result.reason
+
+    logger.info(f"User query: {planner_result.user_query}")
+    logger.info(f"Steps to execute: {planner_result.steps}")
+    # Assume planner_result.steps is a list of step descriptions
+    emit(("steps", "\n".join(planner_result.steps) if isinstance(planner_result.steps, list) else str(planner_result.steps)))
+
+    # Run the planned tool calls in parallel
+    started = time.perf_counter()
+    plan_results = await run_plan(planner_result, forward if stream_responses else None)
+    record("plan", started)
+    for step_result in (plan_results or {}).values():
+        if step_result.error:
+            mark_incomplete(f"plan step {step_result.step_id} failed")
+
+    # Over budget, the executor agent would only be stopped again: summarize what the plan produced
+    usage = current_usage()
+    over_budget = usage.exceeded() if usage is not None else None
+    if over_budget and plan_results is not None and not direct_execution:
+        logger.warning(f"{over_budget}, summarizing the executed steps without the executor agent")
+
+    started = time.perf_counter()
+    if plan_results is not None and (direct_execution or over_budget):
+        # The tools already ran, a single tool-less LLM call writes the answer
+        logger.info("Synthesizing answer from directly executed steps...")
+        if stream_responses:
+            result = await run_synthesizer_agent_streamed(planner_result, plan_results)
+            synthesis = await forward_stream_updates(result, forward)
+            output = GeneralizedOutput(summary=synthesis.summary, plot_data=collect_plot_data(plan_results) or None)
+        else:
+            output = await run_synthesizer_agent(planner_result, plan_results)
+        record("synthesizer", started)
+    else:
+        # The executor agent summarizes the step results and calls tools for anything missing
+        logger.info("Executing steps with executor agent...")
+        executor_input = build_executor_input(planner_result, plan_results)
+        # Scored on the plan rather than on the prompt, which repeats the steps and their results
+        complexity = score_query(planner_result.user_query, planner_result.plan)
+        try:
+            if stream_responses:
+                output = await forward_stream_updates(await run_executor_agent_streamed(executor_input, complexity), forward)
+            else:
+                output = await run_executor_agent(executor_input, complexity)
+        except Exception as e:
+            stop = budget_stop(e)
+            if stop is None:
+                raise
+            # Stop calling tools and answer with what is already there
+            logger.warning(f"Executor agent stopped early: {stop}")
+            mark_incomplete(f"executor agent stopped early: {stop}")
+            output = await run_synthesizer_agent(planner_result, plan_results) if plan_results is not None else partial_output(stop)
+        record("executor", started)
+    logger.info("Executor agent response received.")
+    return output
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,32 @@
+from finance_agents.company_overview_agent import company_overview_agent
+from finance_agents.trend_analysis_agent import trend_analysis_agent
+from finance_agents.top_companies_list_agent import top_company_ranked_agent
+
+from utils.agent_memo import agent_memo
+from utils.ticker_index import ticker_index
+
+# Sub-agent runs behind the agent-as-tool wrappers and the plan graph runtime.
+# Outputs are memoized, so the same analysis asked again on the same data costs nothing.
+
+async def company_overview(ticker: str):
+    ticker = ticker_index.resolve(ticker) or ticker
+    return await agent_memo.run(
+        company_overview_agent,
+        f"Provide a summary overview for the company with ticker {ticker}.",
+        {"ticker": ticker}
+    )
+
+async def company_daily_transaction(ticker: str, metrics: str, date_period: str):
+    ticker = ticker_index.resolve(ticker) or ticker
+    return await agent_memo.run(
+        trend_analysis_agent,
+        f"Analyze {metrics} for {ticker} in the time period {date_period}.",
+        {"ticker": ticker, "metrics": metrics, "date_period": date_period}
+    )
+
+async def top_companies_ranked(n: int, sort_by: str, year: int):
+    return await agent_memo.run(
+        top_company_ranked_agent,
+        f"Provide a list of the top {n} companies ranked by {sort_by} in year {year}.",
+        {"n": n, "sort_by": sort_by, "year": year}
+    )
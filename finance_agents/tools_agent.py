@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 
 from schemas.finance_app import *
 from utils.api_client import retrieve_from_endpoint
+from utils.config import SECTORS_BASE_URL
 import logging
 
 import pandas as pd
@@ -18,7 +19,7 @@ def get_company_overview(ticker: str) -> str:
     """
     Get company overview only from IDX
     """
-    url = f"https://api.sectors.app/v1/company/report/{ticker}/?sections=overview"
+    url = f"{SECTORS_BASE_URL}/company/report/{ticker}/?sections=overview"
 
     try:
         return retrieve_from_endpoint(url)
@@ -58,7 +59,7 @@ def get_daily_transaction(ticker: str, start_date: str, end_date: str) -> str:
     """
     Get daily transaction for an IDX stock
     """
-    url = f"https://api.sectors.app/v1/daily/{ticker}/?start={start_date}&end={end_date}"
+    url = f"{SECTORS_BASE_URL}/daily/{ticker}/?start={start_date}&end={end_date}"
     
     try:
         return retrieve_from_endpoint(url)
@@ -99,7 +100,7 @@ def get_top_companies_ranked_by_classification(classification: TopCompanyClassif
     """
     Get top companies based on classification mentioned by query. 
     """
-    url = f"https://api.sectors.app/v1/companies/top/?classifications={classification}&n_stock={number_of_stock}&year={year}"
+    url = f"{SECTORS_BASE_URL}/companies/top/?classifications={classification}&n_stock={number_of_stock}&year={year}"
     
     try:
         return retrieve_from_endpoint(url)
@@ -1,5 +1,7 @@
 from agents import Agent, Runner, function_tool
-from utils.api_client import retrieve_from_endpoint
+from utils.api_client import aretrieve_from_endpoint
+from utils.config import SECTORS_BASE_URL
+from utils.payload_projection import project
 from datetime import date
 
 from schemas.finance_app import TopCompanyClassification, AnalysisWithPlotOutput
@@ -8,14 +10,14 @@ import pandas as pd
 import plotly.express as px
 
 @function_tool
-def get_top_companies_ranked_by_classification(classification: TopCompanyClassification, number_of_stock:int=3, year:int=2025):
+async def get_top_companies_ranked_by_classification(classification: TopCompanyClassification, number_of_stock:int=3, year:int=2025):
     """
     Get top companies based on classification mentioned by query. 
     """
-    url = f"https://api.sectors.app/v1/companies/top/?classifications={classification}&n_stock={number_of_stock}&year={year}"
+    url = f"{SECTORS_BASE_URL}/companies/top/?classifications={classification}&n_stock={number_of_stock}&year={year}"
     
     try:
-        return retrieve_from_endpoint(url)
+        return project("get_top_companies_ranked_by_classification", await aretrieve_from_endpoint(url))
     except Exception as e:
         print(f"Error occurred: {e}")
         return None
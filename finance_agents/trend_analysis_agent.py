@@ -1,5 +1,7 @@
 from agents import Agent, Runner, function_tool
-from utils.api_client import retrieve_from_endpoint
+from utils.daily_range_cache import get_daily_range
+from utils.trend_analytics import describe_daily_transaction
+from utils.ticker_index import ticker_index
 from datetime import date
 
 from schemas.finance_app import AnalysisWithPlotOutput
@@ -24,14 +26,15 @@ def get_past_n_days(past_n_days: int) -> str:
     return past_date.strftime("%Y-%m-%d")
 
 @function_tool
-def get_daily_transaction(ticker: str, start_date: str, end_date: str) -> str:
+async def get_daily_transaction(ticker: str, start_date: str, end_date: str) -> str:
     """
-    Get daily transaction for an IDX stock
+    Get daily transaction for an IDX stock, with precomputed trend statistics
     """
-    url = f"https://api.sectors.app/v1/daily/{ticker}/?start={start_date}&end={end_date}"
-    
+    symbol = ticker_index.resolve(ticker)
+    if symbol is None:
+        return {"error": f"'{ticker}' is not a known IDX ticker or company name."}
     try:
-        return retrieve_from_endpoint(url)
+        return describe_daily_transaction(await get_daily_range(symbol, start_date, end_date))
     except Exception as e:
         print(f"Error occurred: {e}")
         return None
@@ -44,6 +47,9 @@ trend_analysis_agent = Agent(
         "Do not return any chart as an image. "
         "You must provide: a well-structured time-series dataset, a descriptive plot title, clear axis labels, "
         "and a meaningful analysis that explains patterns, trends, or anomalies in the data."
+        "The get_daily_transaction tool returns precomputed statistics (returns, moving averages, volatility, drawdown, "
+        "volume spikes, anomalies) followed by the series. Base the analysis on these statistics instead of recomputing them, "
+        "and use the series for the plot data. "
         "Ensure the output is suitable for programmatic rendering in a Plotly line chart."
         "Strictly adhere to the AnalysisWithPlotOutput schema. "
         "For 'line_chart' charts: "
@@ -1,13 +1,17 @@
 import streamlit as st
-import asyncio
 import uuid
 
 from agents import trace, InputGuardrailTripwireTriggered
 from finance_agents.orchestrator_agent import run_orchestrator_agent
-from finance_agents.chat_triage_agent import run_chat_triage_agent
+from finance_agents.chat_triage_agent import run_chat_triage_agent, run_chat_triage_agent_streamed
 from schemas.finance_app import TextOnlyOutput, AnalysisWithPlotOutput, GeneralizedOutput
 from utils.display_functions import *
 from utils.config import setup_openai_api_key, setup_sectors_api_key  # Ensure config is loaded to set up API keys
+from utils.cache_warmup import start_cache_warmup
+from utils.response_cache import start_cache_purge
+from utils.metrics import install_metrics
+from utils import async_runtime
+from utils.usage_budget import track_usage
 import logging
 
 setup_openai_api_key()  # Set up OpenAI API key
@@ -23,9 +27,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+start_cache_warmup()  # Prefetch popular Sectors data once per process
+start_cache_purge()  # Drop expired Sectors responses from the shared cache file
+install_metrics()  # Per-stage metrics, served on METRICS_PORT when set
+
 def main():
     set_title(title_text="Chat with IDX AI Assistant", title_icon="💬")
     set_sidebar()
+    display_streaming_toggle()
 
     initialize_chat_history()    
 
@@ -48,26 +57,34 @@ def main():
 
         with st.spinner("Thinking...", show_time=True):
             try:
-                with trace("Finance Agents Chat Workflow Grouped", group_id=st.session_state.chat_id):
-                    chat_history = [{"role": msg["role"], "content": msg["content"]} for msg in st.session_state.messages]
+                with trace("Finance Agents Chat Workflow Grouped", group_id=st.session_state.chat_id), track_usage() as usage:
+                    # Within the token budget: chart data as descriptors, older turns summarized
+                    chat_history = st.session_state.chat_context.build(st.session_state.messages)
                     
-                    agent_response = asyncio.run(run_chat_triage_agent(chat_history))
-                    logger.info(f"Agent response received")
-
                     with st.chat_message("assistant"):
-                        if isinstance(agent_response, GeneralizedOutput):
-                            st.write(agent_response.summary)
-                            if agent_response.plot_data:
-                                display_analysis_with_plot_output(agent_response.plot_data)
+                        if st.session_state.stream_responses:
+                            # Rendered while it is generated, plots once the output is complete
+                            agent_response = display_streamed_response(run_chat_triage_agent_streamed(chat_history))
+                            logger.info(f"Agent response received")
+                        else:
+                            agent_response = async_runtime.run(run_chat_triage_agent(chat_history))
+                            logger.info(f"Agent response received")
+                            if isinstance(agent_response, GeneralizedOutput):
+                                st.write(agent_response.summary)
+                                if agent_response.plot_data:
+                                    display_analysis_with_plot_output(agent_response.plot_data)
+                            else:
+                                st.write(agent_response)
+                        display_usage(usage.as_dict())
 
-                            # Add assistant message to chat history
+                        # Add assistant message to chat history
+                        if isinstance(agent_response, GeneralizedOutput):
                             agent_response_dict = agent_response.model_dump_json()
                             st.session_state.messages.append({
                                 "role": "assistant",
                                 "content": agent_response_dict
                             })
                         else:
-                            st.write(agent_response)
                             st.session_state.messages.append({
                                 "role": "assistant",
                                 "content": agent_response
@@ -54,12 +54,42 @@ class GuardrailViolationInfo(BaseModel):
     reason: str = Field(description="Explanation of the violation.")
     details: str = Field(default="", description="Additional context or details.")
 
+# Define the typed tool invocations a plan is made of
+class CompanyOverviewCall(BaseModel):
+    tool: Literal["get_company_overview"]
+    ticker: str = Field(description="The stock ticker of the company. Ignored when the step fans out over the tickers of another step.")
+
+class DailyTransactionCall(BaseModel):
+    tool: Literal["get_company_daily_transaction"]
+    ticker: str = Field(description="The stock ticker of the company. Ignored when the step fans out over the tickers of another step.")
+    metrics: str = Field(description="The metrics to analyze, such as 'closing price', 'volume' or 'market cap'.")
+    date_period: str = Field(description="The date range for the analysis as in the user query.")
+
+class TopCompaniesCall(BaseModel):
+    tool: Literal["get_top_companies_ranked"]
+    n: int = Field(description="The number of top companies to retrieve.")
+    sort_by: str = Field(description="The criteria to sort the companies, e.g. 'market_cap', 'earnings', 'dividend_yield'.")
+    year: int = Field(description="The year of the ranking.")
+
+PlanToolCall = Union[CompanyOverviewCall, DailyTransactionCall, TopCompaniesCall]
+
+class PlanStep(BaseModel):
+    id: str = Field(description="Unique step id, e.g. 's1'.")
+    call: PlanToolCall = Field(description="The tool to invoke and its arguments.")
+    depends_on: List[str] = Field(description="Ids of the steps that must finish before this one. Empty if the step is independent.")
+    for_each_ticker_from: Optional[str] = Field(
+        description="Id of a step whose resulting company tickers this step runs for, once per ticker. Null for a single invocation."
+    )
+
 # Define the output type for the planner agent
 class PlannerOutput(BaseModel):
     user_query: str = Field(description="The original user query that needs to be processed.")
     execute_steps: bool = Field(description="Indicates whether the steps should be transferred to orchestrator agent and executed.")
     reason: str = Field(description="A reason for the decision to execute or not execute the steps.")
     steps: Optional[str] = Field(description="A list of steps to execute, each step should specify the tool name and parameters.")
+    plan: Optional[List[PlanStep]] = Field(
+        description="The same steps as a dependency graph of typed tool invocations. Independent steps run in parallel."
+    )
 
 # Define generalized and dynamic assistant output
 class TextChunk(BaseModel):
@@ -0,0 +1,179 @@
+# Headless batch runner for regression and warm-up query sets.
+#
+# Each input line is a JSON object with a "query" (or "prompt") and an optional "id":
+#   python -m tools.batch_runner data/example_queries.jsonl --concurrency 4 --output results.jsonl
+#   python -m tools.batch_runner data/example_queries.jsonl --mode orchestrator
+# Results (output summary, status and per-stage timings) are written as JSONL as queries finish,
+# and throughput plus p50/p95/p99 latency are printed at the end.
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODES = ("planner", "orchestrator")
+
+def read_queries(path: str) -> Iterator[dict]:
+    """Stream {"id", "query"} items from a JSONL file ("-" for stdin), skipping blank and malformed lines."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {line_number}: {e}")
+                continue
+            if not isinstance(item, (dict, str)):
+                logger.warning(f"Skipping line {line_number}: expected an object or a string, got {type(item).__name__}")
+                continue
+            query = item if isinstance(item, str) else item.get("query") or item.get("prompt")
+            if not query or not isinstance(query, str):
+                logger.warning(f"Skipping line {line_number}: no query")
+                continue
+            yield {"id": item.get("id", line_number) if isinstance(item, dict) else line_number, "query": query}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _serialize_output(output):
+    return output.model_dump() if hasattr(output, "model_dump") else output
+
+async def run_query(item: dict, mode: str, direct_execution: bool) -> dict:
+    """Answer one query and return its result record. Errors are recorded, not raised."""
+    from agents import trace, InputGuardrailTripwireTriggered
+    from finance_agents.orchestrator_agent import run_orchestrator_agent
+    from finance_agents.planner_executor_agent import run_query_pipeline
+    from utils.usage_budget import track_usage
+
+    record = {"id": item["id"], "query": item["query"], "mode": mode, "stages": {}}
+    started = time.perf_counter()
+    try:
+        with trace(f"Batch {mode} query"), track_usage() as usage:
+            if mode == "orchestrator":
+                output = await run_orchestrator_agent(item["query"])
+                record["stages"]["orchestrator"] = time.perf_counter() - started
+            else:
+                output = await run_query_pipeline(item["query"], direct_execution=direct_execution, timings=record["stages"])
+        record["status"] = "ok"
+        record["output"] = _serialize_output(output)
+    except InputGuardrailTripwireTriggered as e:
+        record["status"] = "blocked"
+        record["error"] = e.guardrail_result.output.output_info.reason
+    except Exception as e:
+        logger.error(f"Query {item['id']} failed: {e}", exc_info=True)
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = time.perf_counter() - started
+    record["usage"] = usage.as_dict()
+    return record
+
+async def run_batch(queries: Iterable[dict], mode: str = "planner", concurrency: int = 4,
+                    output=None, direct_execution: bool = True) -> List[dict]:
+    """
+    Run queries with at most `concurrency` in flight. Input is consumed lazily, so large files
+    stream through. Each record is written to `output` (a text file) as soon as it finishes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    records = []
+    tasks = set()
+
+    async def run(item):
+        try:
+            record = await run_query(item, mode, direct_execution)
+        finally:
+            semaphore.release()
+        records.append(record)
+        if output is not None:
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+        logger.info(f"[{len(records)}] {record['id']}: {record['status']} in {record['latency_s']:.2f}s")
+
+    for item in queries:
+        await semaphore.acquire()
+        task = asyncio.create_task(run(item))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return records
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+def summarize(records: List[dict], wall_time: float) -> dict:
+    """Counts per status, throughput, and latency percentiles overall and per stage."""
+    statuses = {}
+    stages = {}
+    for record in records:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        for stage, seconds in record["stages"].items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        "queries": len(records),
+        "statuses": statuses,
+        "wall_time_s": wall_time,
+        "throughput_qps": len(records) / wall_time if wall_time else 0.0,
+        "latency_s": percentiles([record["latency_s"] for record in records]),
+        "stages_s": {stage: percentiles(values) for stage, values in stages.items()},
+    }
+
+def print_summary(summary: dict):
+    print(f"\n{summary['queries']} queries in {summary['wall_time_s']:.1f}s "
+          f"({summary['throughput_qps']:.2f} queries/s), statuses: {summary['statuses']}")
+    rows = [("total", summary["latency_s"])] + list(summary["stages_s"].items())
+    print(f"{'stage':<14}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, values in rows:
+        if values:
+            print(f"{name:<14}{values['p50']:>8.2f}s{values['p95']:>8.2f}s{values['p99']:>8.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL query set through the agents without Streamlit.")
+    parser.add_argument("input", help="JSONL file of queries, or - for stdin.")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file for the result records.")
+    parser.add_argument("--mode", choices=MODES, default="planner", help="planner: planner/executor pipeline; orchestrator: the orchestrator agent.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries in flight at the same time.")
+    parser.add_argument("--agent-execution", action="store_true", help="Answer through the executor agent instead of direct plan execution.")
+    parser.add_argument("--no-tracing", action="store_true", help="Do not export traces of the batch to OpenAI.")
+    parser.add_argument("--summary", help="Also write the summary as JSON to this file.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while the batch runs.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    from utils.config import setup_openai_api_key, setup_sectors_api_key
+    from utils import async_runtime
+    setup_openai_api_key()
+    setup_sectors_api_key()
+    if args.no_tracing:
+        from agents import set_tracing_disabled
+        set_tracing_disabled(True)
+    if args.metrics_port is not None:
+        from utils.metrics import install_metrics
+        install_metrics(args.metrics_port)
+
+    started = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as output:
+        # Same loop the app runs its pipelines on, so HTTP pools and single-flight maps behave alike
+        records = async_runtime.run(run_batch(
+            read_queries(args.input), args.mode, args.concurrency, output, direct_execution=not args.agent_execution
+        ))
+    summary = summarize(records, time.perf_counter() - started)
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# Offline end-to-end latency benchmark of the agent pipelines.
+#
+# Every agent runs on a scripted model (tools/scripted_model.py) and Sectors is served by the
+# local stand-in (tools/sectors_stub_server.py), so runs need no network and are repeatable:
+#   python -m tools.benchmark                          # compare against benchmarks/baseline.json
+#   python -m tools.benchmark --update-baseline        # record a new baseline
+#   python -m tools.benchmark --model-latency-ms 400 --sectors-latency-ms 150 --pipelines planner_direct
+# Reports wall time (and the time per stage), LLM turns, tool calls and memory allocated per query.
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import tracemalloc
+from statistics import median
+from typing import Dict, List
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = os.path.join("benchmarks", "queries.jsonl")
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+PIPELINES = ("orchestrator", "planner_direct", "planner_direct_streamed", "planner_executor", "chat_triage")
+COUNTED_METRICS = ("llm_turns", "tool_calls", "handoffs")
+MIN_WALL_DELTA_S = 0.05  # wall time changes below this are noise
+MIN_ALLOC_DELTA_KB = 256
+
+def pipeline_runners() -> Dict[str, callable]:
+    """Coroutine factory per pipeline: (query, timings) -> output."""
+    from finance_agents.chat_triage_agent import run_chat_triage_agent
+    from finance_agents.orchestrator_agent import run_orchestrator_agent
+    from finance_agents.planner_executor_agent import run_query_pipeline
+
+    async def orchestrator(query, timings):
+        started = time.perf_counter()
+        output = await run_orchestrator_agent(query)
+        timings["orchestrator"] = time.perf_counter() - started
+        return output
+
+    return {
+        "orchestrator": orchestrator,
+        "planner_direct": lambda query, timings: run_query_pipeline(query, direct_execution=True, timings=timings),
+        "planner_direct_streamed": lambda query, timings: run_query_pipeline(
+            query, direct_execution=True, stream_responses=True, timings=timings
+        ),
+        "planner_executor": lambda query, timings: run_query_pipeline(query, direct_execution=False, timings=timings),
+        "chat_triage": lambda query, timings: run_chat_triage_agent([{"role": "user", "content": query}]),
+    }
+
+def reset_state():
+    """
+    Start every run cold: no memoized agent outputs, guardrail verdicts or Sectors responses,
+    and full rate limit buckets, so a run does not pay for the requests of the one before.
+    """
+    from utils.agent_memo import agent_memo
+    from utils.api_client import clear_response_caches
+    from utils.daily_range_cache import daily_range_cache
+    from utils.idx_classifier import verdict_cache
+    from utils.rate_limiter import DEFAULT_POLICIES, configure_endpoint
+    agent_memo.clear()
+    verdict_cache.clear()
+    clear_response_caches()
+    daily_range_cache.clear()
+    for family in DEFAULT_POLICIES:
+        configure_endpoint(family)
+
+async def run_once(runner, query: str) -> dict:
+    from agents import InputGuardrailTripwireTriggered
+    timings = {}
+    started = time.perf_counter()
+    try:
+        await runner(query, timings)
+        status = "ok"
+    except InputGuardrailTripwireTriggered:
+        status = "blocked"
+    except Exception as e:
+        logger.error(f"Run failed: {type(e).__name__}: {e}", exc_info=True)
+        status = "error"
+    return {"status": status, "wall_s": time.perf_counter() - started, "stages": timings}
+
+async def measure(runner, query: str, model_stats, repeat: int) -> dict:
+    """Time `repeat` cold runs, then repeat once under tracemalloc for the allocations."""
+    runs = []
+    for _ in range(repeat):
+        reset_state()
+        model_stats.reset()
+        runs.append(await run_once(runner, query))
+    counters = model_stats.snapshot()
+
+    reset_state()
+    tracemalloc.start()
+    try:
+        await run_once(runner, query)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stages = sorted({stage for run in runs for stage in run["stages"]})
+    return {
+        "status": runs[-1]["status"],
+        "wall_s": round(median(run["wall_s"] for run in runs), 4),
+        "wall_min_s": round(min(run["wall_s"] for run in runs), 4),
+        "stages_s": {stage: round(median(run["stages"].get(stage, 0.0) for run in runs), 4) for stage in stages},
+        "llm_turns": counters["llm_turns"],
+        "tool_calls": counters["tool_calls"],
+        "handoffs": counters["handoffs"],
+        "turns_per_agent": counters["turns_per_agent"],
+        "alloc_peak_kb": round(peak / 1024),
+        "alloc_retained_kb": round(current / 1024),
+    }
+
+def load_queries(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of the report against a baseline. Turns, tool calls, handoffs and status are
+    deterministic and must not grow or change; wall time and peak allocations may grow by `tolerance`.
+    """
+    regressions = []
+    for pipeline, queries in baseline["results"].items():
+        for query_id, base in queries.items():
+            current = report["results"].get(pipeline, {}).get(query_id)
+            if current is None:
+                continue
+            name = f"{pipeline}/{query_id}"
+            if current["status"] != base["status"]:
+                regressions.append(f"{name}: status {base['status']} -> {current['status']}")
+            elif current["status"] == "ok":
+                # Guardrails run alongside the first LLM turn, so a blocked run may or may not have made it
+                for metric in COUNTED_METRICS:
+                    if current[metric] > base[metric]:
+                        regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+            if current["wall_s"] > base["wall_s"] * (1 + tolerance) + MIN_WALL_DELTA_S:
+                regressions.append(f"{name}: wall time {base['wall_s']:.3f}s -> {current['wall_s']:.3f}s")
+            if current["alloc_peak_kb"] > base["alloc_peak_kb"] * (1 + tolerance) + MIN_ALLOC_DELTA_KB:
+                regressions.append(f"{name}: peak allocations {base['alloc_peak_kb']}KB -> {current['alloc_peak_kb']}KB")
+    return regressions
+
+def print_report(report: dict):
+    print(f"{'pipeline':<24}{'query':<22}{'status':<9}{'wall':>8}{'turns':>7}{'tools':>7}{'peak KB':>9}  stages")
+    for pipeline, queries in report["results"].items():
+        for query_id, result in queries.items():
+            stages = " ".join(f"{stage}={seconds:.3f}" for stage, seconds in result["stages_s"].items())
+            print(f"{pipeline:<24}{query_id:<22}{result['status']:<9}{result['wall_s']:>7.3f}s"
+                  f"{result['llm_turns']:>7}{result['tool_calls']:>7}{result['alloc_peak_kb']:>9}  {stages}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the agent pipelines.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSONL file of {\"id\", \"query\"} objects.")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help=f"Comma-separated subset of {', '.join(PIPELINES)}.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query; the median is reported.")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated time of every LLM call.")
+    parser.add_argument("--sectors-latency-ms", type=float, default=0.0, help="Latency of the Sectors stand-in.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative growth of wall time and allocations.")
+    parser.add_argument("--output", help="Also write the full report as JSON to this file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(levelname)s | %(message)s")
+    unknown = set(args.pipelines.split(",")) - set(PIPELINES)
+    if unknown:
+        parser.error(f"Unknown pipelines: {', '.join(sorted(unknown))}")
+
+    # Point the app at the stand-in and at throwaway caches before any app module reads its settings
+    from tools.sectors_stub_server import Profile, start_stub_server
+    server = start_stub_server(profiles={"default": Profile(latency_ms=args.sectors_latency_ms)})
+    cache_dir = tempfile.mkdtemp(prefix="agentic-benchmark-")
+    os.environ["SECTORS_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["SECTORS_CACHE_PATH"] = os.path.join(cache_dir, "sectors_responses.sqlite3")
+    os.environ["SECTORS_TIMESERIES_PATH"] = os.path.join(cache_dir, "daily")
+    os.environ["MODEL_ROUTING_LOG"] = os.path.join(cache_dir, "model_routing.jsonl")
+    os.environ.setdefault("SECTORS_API_KEY", "offline-benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+    from agents import set_tracing_disabled
+    from tools.scripted_model import all_agents, scripted_models
+    from utils import async_runtime
+    set_tracing_disabled(True)
+
+    runners = pipeline_runners()
+    queries = load_queries(args.queries)
+    report = {
+        "config": {
+            "repeat": args.repeat,
+            "model_latency_ms": args.model_latency_ms,
+            "sectors_latency_ms": args.sectors_latency_ms,
+            "python": sys.version.split()[0],
+        },
+        "results": {},
+    }
+    with scripted_models(all_agents(), latency_ms=args.model_latency_ms) as model_stats:
+        for pipeline in args.pipelines.split(","):
+            report["results"][pipeline] = {}
+            for item in queries:
+                report["results"][pipeline][item["id"]] = async_runtime.run(
+                    measure(runners[pipeline], item["query"], model_stats, args.repeat)
+                )
+    server.shutdown()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --update-baseline to record one")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != report["config"]:
+        print(f"\nWarning: baseline was recorded with {baseline['config']}, timings are not comparable")
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# Deterministic stand-in for the LLM behind every agent, for offline benchmarks.
+#
+# Each agent answers from a script keyed on its name: it reads the intent of the query with
+# simple rules, calls the same tools a real model would, and returns output of the agent's schema.
+#   with scripted_models(all_agents(), latency_ms=300) as model_stats:
+#       await run_orchestrator_agent("Show me summary of TLKM")
+#   print(model_stats.snapshot())
+
+import re
+import json
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelTracing
+from agents.tracing import generation_span
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+from utils.ticker_index import ticker_index
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYWORDS = {
+    "dividend": "dividend_yield",
+    "earning": "earnings",
+    "revenue": "earnings",
+    "market cap": "market_cap",
+    "p/b": "pb",
+    "pbv": "pb",
+    "p/e": "pe",
+    "per ": "pe",
+    "p/s": "ps",
+}
+DAILY_KEYWORDS = ("daily", "price", "closing", "volume", "trend", "transaction", "days")
+OVERVIEW_KEYWORDS = ("summary", "overview", "profile", "about")
+METRIC_KEYWORDS = {"volume": "volume", "market cap": "market cap"}
+SYMBOL_PATTERN = re.compile(r"\b([A-Z0-9]{4})(?:\.JK)?\b")
+CHARS_PER_TOKEN = 4  # rough size of a token, for the usage reported to the runner
+
+@dataclass
+class ModelStats:
+    """Counters of the scripted model calls, shared by all scripted agents."""
+    llm_turns: int = 0
+    tool_calls: int = 0
+    handoffs: int = 0
+    turns_per_agent: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, agent_name: str, tool_calls: int = 0, handoffs: int = 0):
+        with self._lock:
+            self.llm_turns += 1
+            self.tool_calls += tool_calls
+            self.handoffs += handoffs
+            self.turns_per_agent[agent_name] = self.turns_per_agent.get(agent_name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.llm_turns = self.tool_calls = self.handoffs = 0
+            self.turns_per_agent = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "llm_turns": self.llm_turns,
+                "tool_calls": self.tool_calls,
+                "handoffs": self.handoffs,
+                "turns_per_agent": dict(self.turns_per_agent),
+            }
+
+@dataclass
+class Intent:
+    """What a query asks for, read with keyword rules."""
+    tickers: List[str]
+    top: Optional[dict] = None  # {"n", "sort_by", "year"}
+    daily: bool = False
+    overview: bool = False
+    metrics: str = "closing price"
+    days: int = 30
+
+def parse_intent(text: str) -> Intent:
+    lowered = text.lower()
+    intent = Intent(tickers=ticker_index.find_mentions(text))
+
+    top = re.search(r"\btop\s+(\d+)", lowered)
+    if top:
+        sort_by = next((value for keyword, value in SORT_KEYWORDS.items() if keyword in lowered), "market_cap")
+        year = re.search(r"\b(20\d\d)\b", lowered)
+        intent.top = {"n": int(top.group(1)), "sort_by": sort_by, "year": int(year.group(1)) if year else date.today().year}
+
+    days = re.search(r"(\d+)\s+days", lowered)
+    if days:
+        intent.days = int(days.group(1))
+    intent.metrics = next((value for keyword, value in METRIC_KEYWORDS.items() if keyword in lowered), "closing price")
+    intent.daily = bool(intent.tickers) and any(keyword in lowered for keyword in DAILY_KEYWORDS)
+    intent.overview = any(keyword in lowered for keyword in OVERVIEW_KEYWORDS) or (bool(intent.tickers) and not intent.daily)
+    return intent
+
+def plan_calls(intent: Intent) -> List[dict]:
+    """The app-level tool invocations for an intent, as plan steps."""
+    steps = []
+    if intent.top:
+        steps.append({"id": "s1", "call": {"tool": "get_top_companies_ranked", **intent.top}, "depends_on": [], "for_each_ticker_from": None})
+        if intent.overview and not intent.tickers:
+            steps.append({"id": "s2", "call": {"tool": "get_company_overview", "ticker": "-"}, "depends_on": ["s1"], "for_each_ticker_from": "s1"})
+    for ticker in intent.tickers:
+        if intent.overview:
+            steps.append({"id": f"s{len(steps) + 1}", "call": {"tool": "get_company_overview", "ticker": ticker},
+                          "depends_on": [], "for_each_ticker_from": None})
+        if intent.daily:
+            steps.append({"id": f"s{len(steps) + 1}", "call": {
+                "tool": "get_company_daily_transaction", "ticker": ticker,
+                "metrics": intent.metrics, "date_period": f"last {intent.days} days",
+            }, "depends_on": [], "for_each_ticker_from": None})
+    return steps
+
+@dataclass
+class Turn:
+    """What the scripted model sees on one call."""
+    agent_name: str
+    query: str  # last user message
+    tool_outputs: List[str]  # outputs of the agent's tool calls since that message, in order
+    tool_names: List[str]
+    handoff_tools: List[str]
+
+# A script returns a list of (tool name, arguments) to call, or the final output
+Script = Callable[[Turn], object]
+
+def _calls(name: str, arguments: dict) -> List[tuple]:
+    return [(name, arguments)]
+
+def _symbols(outputs: Iterable[str]) -> List[str]:
+    symbols = []
+    for output in outputs:
+        for symbol in SYMBOL_PATTERN.findall(output):
+            if symbol in ticker_index.companies and symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+def _summary(turn: Turn) -> str:
+    return f"Scripted answer to '{turn.query[:80]}' from {len(turn.tool_outputs)} tool result(s)."
+
+def planner_script(turn: Turn):
+    steps = plan_calls(parse_intent(turn.query))
+    return {
+        "user_query": turn.query,
+        "execute_steps": bool(steps),
+        "reason": "The query maps to the available tools." if steps else "No available tool answers this query.",
+        "steps": "\n".join(f"Step {i + 1}: {step['call']['tool']}" for i, step in enumerate(steps)) or None,
+        "plan": steps or None,
+    }
+
+def tool_user_script(turn: Turn):
+    """Orchestrator and executor: call the planned tools in dependency order, then summarize."""
+    if "Results of executed steps:" in turn.query:
+        # The executor was given the plan results, as instructed it answers from them
+        return {"summary": _summary(turn), "plot_data": None}
+    intent = parse_intent(turn.query.split("\n")[0])
+    steps = plan_calls(intent)
+    independent = [step for step in steps if not step["depends_on"]]
+    fan_out = [step for step in steps if step["for_each_ticker_from"]]
+    if not turn.tool_outputs and independent:
+        return [(step["call"]["tool"], {k: v for k, v in step["call"].items() if k != "tool"}) for step in independent]
+    if fan_out and len(turn.tool_outputs) == len(independent):
+        tickers = _symbols(turn.tool_outputs)
+        if tickers:
+            return [("get_company_overview", {"ticker": ticker}) for ticker in tickers]
+    return {"summary": _summary(turn), "plot_data": None}
+
+def company_overview_script(turn: Turn):
+    if not turn.tool_outputs:
+        tickers = ticker_index.find_mentions(turn.query)
+        return _calls("get_company_overview", {"ticker": tickers[0] if tickers else turn.query.split()[-1].strip(".")})
+    return {"summary": _summary(turn)}
+
+def daily_transaction_script(turn: Turn):
+    intent = parse_intent(turn.query)
+    if not turn.tool_outputs:
+        return _calls("get_past_n_days", {"past_n_days": intent.days})
+    if len(turn.tool_outputs) == 1:
+        start = turn.tool_outputs[0].strip().strip('"')
+        ticker = intent.tickers[0] if intent.tickers else turn.query.split()[-1]
+        return _calls("get_daily_transaction", {"ticker": ticker, "start_date": start, "end_date": date.today().isoformat()})
+    end = date.today()
+    dates = [(end - timedelta(days=i)).isoformat() for i in range(min(intent.days, 30), -1, -1)]
+    return {
+        "summary": _summary(turn),
+        "plot_data": [{
+            "x": dates, "y": [float(i) for i in range(len(dates))], "category": None, "chart_type": "line_chart",
+            "plot_title": f"Daily {intent.metrics}", "x_axis_title": "Date", "y_axis_title": intent.metrics,
+        }],
+    }
+
+def top_companies_script(turn: Turn):
+    intent = parse_intent(turn.query)
+    top = intent.top or {"n": 5, "sort_by": "market_cap", "year": date.today().year}
+    if not turn.tool_outputs:
+        sort_by = top["sort_by"] if top["sort_by"] in ("dividend_yield", "earnings", "market_cap", "pb", "pe", "ps") else "market_cap"
+        return _calls("get_top_companies_ranked_by_classification",
+                      {"classification": sort_by, "number_of_stock": top["n"], "year": top["year"]})
+    symbols = _symbols(turn.tool_outputs)
+    return {
+        "summary": _summary(turn),
+        "plot_data": [{
+            "x": [float(len(symbols) - i) for i in range(len(symbols))], "y": symbols, "category": None,
+            "chart_type": "bar_horizontal_chart", "plot_title": f"Top companies by {top['sort_by']}",
+            "x_axis_title": top["sort_by"], "y_axis_title": "Company",
+        }],
+    }
+
+def guardrail_script(turn: Turn):
+    return {"is_idx_only_query": bool(ticker_index.find_mentions(turn.query)) or "idx" in turn.query.lower(),
+            "reasoning": "Scripted verdict."}
+
+def triage_script(turn: Turn):
+    intent = parse_intent(turn.query)
+    if turn.handoff_tools and (intent.tickers or intent.top):
+        return _calls(turn.handoff_tools[0], {})
+    return "I can help with IDX company overviews, daily transactions and top-ranked companies."
+
+def synthesizer_script(turn: Turn):
+    return {"summary": f"Scripted synthesis of: {turn.query[:120]}"}
+
+SCRIPTS: Dict[str, Script] = {
+    "Planner Agent": planner_script,
+    "Orchestrator Agent": tool_user_script,
+    "Executor Agent": tool_user_script,
+    "Synthesizer Agent": synthesizer_script,
+    "Company Overview Agent": company_overview_script,
+    "Daily Transaction Agent": daily_transaction_script,
+    "Top Company Ranked Agent": top_companies_script,
+    "IDX Query Analysis Agent": guardrail_script,
+    "Chat Triage Agent": triage_script,
+}
+
+def _text_of(content) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+def _read_input(input, tool_names: List[str]) -> tuple:
+    """
+    The last user message, and the outputs of the calls to the agent's own tools made after it
+    (a handoff leaves the previous agent's calls in the input).
+    """
+    if isinstance(input, str):
+        return input, []
+    items = [item for item in input if isinstance(item, dict)]
+    user_messages = [i for i, item in enumerate(items) if item.get("role") == "user"]
+    query = _text_of(items[user_messages[-1]]["content"]) if user_messages else ""
+    items = items[user_messages[-1] + 1:] if user_messages else items
+    own_calls = {item.get("call_id") for item in items if item.get("type") == "function_call" and item.get("name") in tool_names}
+    outputs = [str(item.get("output", "")) for item in items
+               if item.get("type") == "function_call_output" and item.get("call_id") in own_calls]
+    return query, outputs
+
+class ScriptedModel(Model):
+    """
+    Model for one agent that answers from its script instead of an LLM, after `latency_ms`
+    of simulated model time. Token usage is estimated from the prompt and answer sizes.
+    """
+
+    def __init__(self, agent_name: str, script: Script, stats: ModelStats, latency_ms: float = 0.0):
+        self.agent_name = agent_name
+        self.script = script
+        self.stats = stats
+        self.latency_ms = latency_ms
+        self._call_ids = 0
+
+    async def _respond(self, system_instructions, input, tools, output_schema, handoffs) -> ModelResponse:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        tool_names = [tool.name for tool in tools]
+        query, tool_outputs = _read_input(input, tool_names)
+        turn = Turn(
+            agent_name=self.agent_name,
+            query=query,
+            tool_outputs=tool_outputs,
+            tool_names=tool_names,
+            handoff_tools=[handoff.tool_name for handoff in handoffs],
+        )
+        answer = self.script(turn)
+
+        if isinstance(answer, list):
+            output = []
+            for name, arguments in answer:
+                self._call_ids += 1
+                call_id = f"call_{self.agent_name.split()[0].lower()}_{self._call_ids}"
+                output.append(ResponseFunctionToolCall(
+                    id=call_id, call_id=call_id, type="function_call", name=name, arguments=json.dumps(arguments)
+                ))
+            handoff_calls = sum(1 for name, _ in answer if name in turn.handoff_tools)
+            self.stats.record(self.agent_name, tool_calls=len(answer) - handoff_calls, handoffs=handoff_calls)
+            text = json.dumps(answer)
+        else:
+            text = answer if isinstance(answer, str) else json.dumps(answer)
+            output = [ResponseOutputMessage(
+                id="msg_scripted", type="message", role="assistant", status="completed",
+                content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+            )]
+            self.stats.record(self.agent_name)
+
+        prompt_size = len(system_instructions or "") + len(json.dumps(input, default=str))
+        usage = Usage(
+            requests=1,
+            input_tokens=prompt_size // CHARS_PER_TOKEN,
+            output_tokens=len(text) // CHARS_PER_TOKEN,
+            total_tokens=(prompt_size + len(text)) // CHARS_PER_TOKEN,
+        )
+        return ModelResponse(output=output, usage=usage, response_id=None)
+
+    async def _traced_respond(self, system_instructions, input, tools, output_schema, handoffs, tracing: ModelTracing):
+        # A generation span like the real models emit, so tracing processors see LLM time and tokens
+        with generation_span(model="scripted", disabled=tracing.is_disabled()) as span:
+            response = await self._respond(system_instructions, input, tools, output_schema, handoffs)
+            span.span_data.usage = {"input_tokens": response.usage.input_tokens, "output_tokens": response.usage.output_tokens}
+        return response
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                           tracing, *, previous_response_id, prompt=None) -> ModelResponse:
+        return await self._traced_respond(system_instructions, input, tools, output_schema, handoffs, tracing)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                              tracing, *, previous_response_id, prompt=None):
+        response = await self._traced_respond(system_instructions, input, tools, output_schema, handoffs, tracing)
+        sequence_number = 0
+        for item in response.output:
+            if isinstance(item, ResponseOutputMessage):
+                text = item.content[0].text
+                for start in range(0, len(text), 20):
+                    yield ResponseTextDeltaEvent(
+                        type="response.output_text.delta", item_id=item.id, output_index=0, content_index=0,
+                        delta=text[start:start + 20], logprobs=[], sequence_number=sequence_number,
+                    )
+                    sequence_number += 1
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=sequence_number,
+            response=Response(
+                id="resp_scripted", created_at=time.time(), model="scripted", object="response",
+                output=response.output, tool_choice="auto", tools=[], parallel_tool_calls=True,
+            ),
+        )
+
+def all_agents() -> List[Agent]:
+    """The agents of the app, imported on demand so the Sectors base URL can be set first."""
+    from finance_agents.chat_triage_agent import chat_triage_agent
+    from finance_agents.company_overview_agent import company_overview_agent
+    from finance_agents.input_guardrails import query_analysis_agent
+    from finance_agents.orchestrator_agent import orchestrator_agent
+    from finance_agents.planner_executor_agent import executor_agent, planner_agent, synthesizer_agent
+    from finance_agents.top_companies_list_agent import top_company_ranked_agent
+    from finance_agents.trend_analysis_agent import trend_analysis_agent
+    return [
+        chat_triage_agent, company_overview_agent, query_analysis_agent, orchestrator_agent, executor_agent,
+        planner_agent, synthesizer_agent, top_company_ranked_agent, trend_analysis_agent,
+    ]
+
+@contextmanager
+def scripted_models(agents: Iterable[Agent], latency_ms: float = 0.0):
+    """Give each agent a scripted model for the duration of the block, and yield the shared ModelStats."""
+    stats = ModelStats()
+    original = []
+    for agent in agents:
+        script = SCRIPTS.get(agent.name)
+        if script is None:
+            raise ValueError(f"No script for agent {agent.name!r}")
+        original.append((agent, agent.model))
+        agent.model = ScriptedModel(agent.name, script, stats, latency_ms)
+    try:
+        yield stats
+    finally:
+        for agent, model in original:
+            agent.model = model
@@ -0,0 +1,322 @@
+# Local stand-in for the Sectors.app API, for offline development, benchmarks and load tests.
+#
+# Serve recorded fixtures (falling back to deterministic synthetic data):
+#   python -m tools.sectors_stub_server --port 8765 --latency-ms 150 --jitter-ms 50 --error-rate 0.05
+# Record real responses into fixtures while proxying them:
+#   python -m tools.sectors_stub_server --port 8765 --record
+# Then point the app at it:
+#   SECTORS_BASE_URL=http://127.0.0.1:8765/v1 streamlit run Home.py
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field, asdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES_DIR = os.path.join("fixtures", "sectors")
+UPSTREAM_URL = os.getenv("SECTORS_UPSTREAM_URL", "https://api.sectors.app")
+
+ROUTES = {
+    "daily": re.compile(r"^/v1/daily/(?P<ticker>[^/]+)/?$"),
+    "company_report": re.compile(r"^/v1/company/report/(?P<ticker>[^/]+)/?$"),
+    "companies_top": re.compile(r"^/v1/companies/top/?$"),
+}
+
+@dataclass
+class Profile:
+    """Latency and error injection for one endpoint family."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [503])
+    retry_after: Optional[float] = 1.0  # sent with injected 429s
+
+def load_profiles(path: Optional[str], default: Profile) -> Dict[str, Profile]:
+    """
+    Load per-family profiles from a JSON file such as
+    {"default": {"latency_ms": 100}, "daily": {"latency_ms": 300, "error_rate": 0.1, "error_statuses": [429]}}
+    """
+    profiles = {"default": default}
+    if path:
+        with open(path) as f:
+            for family, values in json.load(f).items():
+                profiles[family] = Profile(**{**asdict(default), **values})
+    return profiles
+
+def request_key(path: str, query: str) -> str:
+    """Normalized request path and query, the identity of a fixture."""
+    query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return f"{path}?{query}" if query else path
+
+class FixtureStore:
+    """
+    Fixtures are JSON files under <root>/<family>/ holding the request, status and body.
+    Exact matches are served first. Daily requests can also be answered from any fixture of
+    the same ticker, filtered to the requested dates.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        self._daily_rows = {}
+        if os.path.isdir(root):
+            for family in os.listdir(root):
+                family_dir = os.path.join(root, family)
+                for name in os.listdir(family_dir) if os.path.isdir(family_dir) else []:
+                    if name.endswith(".json"):
+                        with open(os.path.join(family_dir, name)) as f:
+                            self._index(family, json.load(f))
+        logger.info(f"Loaded {len(self._fixtures)} fixture(s) from {root}")
+
+    def _index(self, family: str, fixture: dict):
+        self._fixtures[fixture["request"]] = fixture
+        if family == "daily" and fixture["status"] == 200 and isinstance(fixture["body"], list):
+            ticker = ROUTES["daily"].match(urlsplit(fixture["request"]).path).group("ticker").upper()
+            rows = self._daily_rows.setdefault(ticker, {})
+            for row in fixture["body"]:
+                rows[row["date"][:10]] = row
+
+    def lookup(self, family: str, key: str, params: dict) -> Optional[Tuple[int, object]]:
+        with self._lock:
+            fixture = self._fixtures.get(key)
+            if fixture is not None:
+                return fixture["status"], fixture["body"]
+            if family == "daily":
+                ticker = ROUTES["daily"].match(urlsplit(key).path).group("ticker").upper()
+                rows = self._daily_rows.get(ticker)
+                if rows and params.get("start") and params.get("end"):
+                    return 200, [rows[d] for d in sorted(rows) if params["start"] <= d <= params["end"]]
+        return None
+
+    def save(self, family: str, key: str, status: int, body):
+        fixture = {"request": key, "status": status, "body": body}
+        family_dir = os.path.join(self.root, family)
+        os.makedirs(family_dir, exist_ok=True)
+        name = hashlib.sha1(key.encode()).hexdigest()[:16] + ".json"
+        with open(os.path.join(family_dir, name), "w") as f:
+            json.dump(fixture, f, indent=1)
+        with self._lock:
+            self._index(family, fixture)
+
+def _seeded(*parts) -> random.Random:
+    return random.Random(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest())
+
+def synthetic_response(family: str, match: re.Match, params: dict):
+    """Deterministic fake payloads shaped like the Sectors responses, for runs without fixtures."""
+    if family == "daily":
+        ticker = match.group("ticker").upper()
+        start = date.fromisoformat(params.get("start", (date.today() - timedelta(days=30)).isoformat()))
+        end = date.fromisoformat(params.get("end", date.today().isoformat()))
+        rows = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                # Price is a function of ticker and date only, so overlapping ranges agree
+                rng = _seeded(ticker, day)
+                base = 1000 + _seeded(ticker).randint(0, 9000)
+                close = round(base * (1 + 0.1 * ((day.toordinal() % 90) / 90 - 0.5)) + rng.randint(-50, 50))
+                rows.append({
+                    "symbol": f"{ticker}.JK",
+                    "date": day.isoformat(),
+                    "close": close,
+                    "volume": rng.randint(1_000_000, 90_000_000),
+                    "market_cap": close * 10_000_000_000,
+                })
+            day += timedelta(days=1)
+        return rows
+
+    if family == "company_report":
+        ticker = match.group("ticker").upper()
+        rng = _seeded(ticker)
+        return {
+            "symbol": f"{ticker}.JK",
+            "company_name": f"PT {ticker.title()} Tbk.",
+            "overview": {
+                "listing_board": "Main",
+                "industry": "Banks",
+                "sub_industry": "Banks",
+                "sector": "Financials",
+                "sub_sector": "Banks",
+                "market_cap": rng.randint(10, 1000) * 10**12,
+                "market_cap_rank": rng.randint(1, 900),
+                "employee_num": rng.randint(500, 50000),
+                "listing_date": "2000-05-31",
+                "website": f"www.{ticker.lower()}.co.id",
+                "last_close_price": rng.randint(100, 10000),
+                "latest_close_date": date.today().isoformat(),
+                "daily_close_change": round(rng.uniform(-0.05, 0.05), 4),
+            },
+        }
+
+    # Rank companies of the local ticker index, so follow-up requests for them resolve
+    from utils.ticker_index import ticker_index
+    companies = sorted(ticker_index.companies.values(), key=lambda company: company.symbol)
+    classifications = params.get("classifications", "market_cap").split(",")
+    n_stock = int(params.get("n_stock", 5))
+    body = {}
+    for classification in classifications:
+        rng = _seeded(classification, params.get("year"))
+        values = sorted((rng.uniform(1, 100) for _ in range(n_stock)), reverse=True)
+        picked = rng.sample(companies, min(n_stock, len(companies)))
+        body[classification] = [
+            {
+                "symbol": f"{picked[i].symbol}.JK" if i < len(picked) else f"STK{i + 1}.JK",
+                "company_name": picked[i].name if i < len(picked) else f"PT Stock {i + 1} Tbk.",
+                classification: round(value, 4),
+            }
+            for i, value in enumerate(values)
+        ]
+    return body
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures: FixtureStore, profiles: Dict[str, Profile],
+                 record: bool = False, synthetic: bool = True):
+        super().__init__(address, SectorsStubHandler)
+        self.fixtures = fixtures
+        self.profiles = profiles
+        self.record = record
+        self.synthetic = synthetic
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "fixture_hits": 0, "synthetic": 0, "recorded": 0, "injected_errors": 0, "not_found": 0}
+        self._upstream = None
+
+    def count(self, name: str):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def upstream(self):
+        if self._upstream is None:
+            import httpx
+            from utils.config import setup_sectors_api_key
+            setup_sectors_api_key()
+            self._upstream = httpx.Client(
+                base_url=UPSTREAM_URL, headers={"Authorization": os.getenv("SECTORS_API_KEY")}, timeout=30.0
+            )
+        return self._upstream
+
+class SectorsStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body, headers: Optional[dict] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server: StubServer = self.server
+        server.count("requests")
+        parts = urlsplit(self.path)
+
+        if parts.path == "/stats":
+            with server.stats_lock:
+                return self._send_json(200, server.stats)
+
+        family, match = next(
+            ((family, m) for family, pattern in ROUTES.items() if (m := pattern.match(parts.path))), (None, None)
+        )
+        if family is None:
+            server.count("not_found")
+            return self._send_json(404, {"detail": "Not found."})
+
+        profile = server.profiles.get(family, server.profiles["default"])
+        delay = max(0.0, profile.latency_ms + random.uniform(-profile.jitter_ms, profile.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if profile.error_rate and random.random() < profile.error_rate:
+            server.count("injected_errors")
+            status = random.choice(profile.error_statuses)
+            headers = {"Retry-After": str(profile.retry_after)} if status == 429 and profile.retry_after is not None else None
+            return self._send_json(status, {"detail": "Injected error."}, headers)
+
+        params = dict(parse_qsl(parts.query))
+        key = request_key(parts.path, parts.query)
+        found = server.fixtures.lookup(family, key, params)
+        if found is not None:
+            server.count("fixture_hits")
+            return self._send_json(*found)
+
+        if server.record:
+            response = server.upstream().get(key)
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"error": response.text}
+            if response.status_code < 500:
+                server.fixtures.save(family, key, response.status_code, body)
+                server.count("recorded")
+            return self._send_json(response.status_code, body)
+
+        if server.synthetic:
+            server.count("synthetic")
+            return self._send_json(200, synthetic_response(family, match, params))
+
+        server.count("not_found")
+        return self._send_json(404, {"detail": f"No fixture for {key}"})
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, fixtures_dir: str = DEFAULT_FIXTURES_DIR,
+                      profiles: Optional[Dict[str, Profile]] = None, record: bool = False,
+                      synthetic: bool = True) -> StubServer:
+    """Start the stand-in in a background thread. Its base URL is http://host:server.server_port/v1."""
+    server = StubServer(
+        (host, port), FixtureStore(fixtures_dir), profiles or {"default": Profile()}, record=record, synthetic=synthetic
+    )
+    threading.Thread(target=server.serve_forever, name="sectors-stub", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Sectors.app API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="Directory of recorded fixtures.")
+    parser.add_argument("--record", action="store_true", help="Proxy unknown requests to the real API and save them.")
+    parser.add_argument("--no-synthetic", action="store_true", help="Return 404 instead of synthetic data when no fixture matches.")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an injected error.")
+    parser.add_argument("--error-statuses", default="503", help="Comma-separated statuses for injected errors, e.g. 429,503.")
+    parser.add_argument("--profile", help="JSON file with per-family latency and error profiles.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    default = Profile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",")],
+    )
+    server = StubServer(
+        (args.host, args.port), FixtureStore(args.fixtures), load_profiles(args.profile, default),
+        record=args.record, synthetic=not args.no_synthetic
+    )
+    logger.info(f"Sectors stand-in listening on http://{args.host}:{server.server_port}/v1 (record={args.record})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
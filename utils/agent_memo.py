@@ -0,0 +1,79 @@
+import os
+from typing import Any
+
+from agents import Agent
+from agents.items import ToolCallOutputItem
+
+from utils.data_version import data_version
+from utils.idx_classifier import normalize_query
+from utils import metrics
+from utils.payload_projection import is_error_payload
+from utils.pipeline_cache import mark_incomplete
+from utils.single_flight import SingleFlight
+from utils.ttl_cache import TTLCache
+from utils.usage_budget import budget_stop, run_agent
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+AGENT_MEMO_SIZE = int(os.getenv("AGENT_MEMO_SIZE", "512"))
+AGENT_MEMO_TTL = float(os.getenv("AGENT_MEMO_TTL", "3600"))
+
+def _normalize_argument(value: Any):
+    return normalize_query(value) if isinstance(value, str) else value
+
+def _tools_succeeded(result) -> bool:
+    """False when a tool of the run returned nothing or an error payload, so a transient failure is not memoized."""
+    return not any(
+        isinstance(item, ToolCallOutputItem) and is_error_payload(item.output)
+        for item in result.new_items
+    )
+
+class AgentMemo:
+    """
+    Memo of sub-agent final outputs keyed on the agent name, its normalized arguments and the
+    Sectors data version, with LRU/TTL eviction. Concurrent runs with the same key share one run.
+    Memoized outputs are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = AGENT_MEMO_SIZE, ttl: float = AGENT_MEMO_TTL):
+        self._cache = TTLCache(maxsize, ttl)
+        # A budget stop belongs to the leader's request, a follower within its own budget reruns the agent
+        self._single_flight = SingleFlight("agent_memo", private=lambda e: budget_stop(e) is not None)
+
+    def key(self, agent_name: str, arguments: dict) -> tuple:
+        return agent_name, tuple(sorted((name, _normalize_argument(value)) for name, value in arguments.items())), data_version()
+
+    async def run(self, agent: Agent, prompt: str, arguments: dict):
+        """Return the final output of run_agent(agent, prompt), reusing the memoized one for the same arguments."""
+        key = self.key(agent.name, arguments)
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.info(f"Agent memo hit for {agent.name} {arguments}")
+            metrics.cache_requests_total.inc(cache="agent_memo", result="hit")
+            return cached
+        metrics.cache_requests_total.inc(cache="agent_memo", result="miss")
+
+        async def run():
+            result = await run_agent(agent, prompt)
+            succeeded = _tools_succeeded(result)
+            if succeeded:
+                self._cache.set(key, result.final_output)
+            else:
+                logger.info(f"Not memoizing {agent.name} {arguments}, a tool failed")
+            return result.final_output, succeeded
+
+        # Followers get whether the tools succeeded too, so every caller can mark its answer
+        output, succeeded = await self._single_flight.do(key, run)
+        if not succeeded:
+            mark_incomplete(f"a tool of {agent.name} failed")
+        return output
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), **self._single_flight.stats()}
+
+agent_memo = AgentMemo()
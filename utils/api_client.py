@@ -1,9 +1,16 @@
 import os
-import json
-import requests
-from utils.config import setup_sectors_api_key
+import time
+import asyncio
+import weakref
 
-import streamlit as st
+import httpx
+from utils.config import setup_sectors_api_key
+from utils.response_cache import response_cache, normalize_url, ttl_for, endpoint_family
+from utils.rate_limiter import get_controller
+from utils.single_flight import SingleFlight
+from utils.ttl_cache import TTLCache
+from utils import async_runtime
+from utils import metrics
 
 import logging
 
@@ -15,25 +22,128 @@ SECTORS_API_KEY = os.getenv("SECTORS_API_KEY")
 
 headers = {"Authorization": SECTORS_API_KEY}
 
-@st.cache_data(ttl=3600)
-def retrieve_from_endpoint(url: str) -> dict:
+# Keep-alive pool shared by every Sectors call made from the same event loop
+HTTP_TIMEOUT = httpx.Timeout(float(os.getenv("SECTORS_HTTP_TIMEOUT", "30")), connect=10.0)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("SECTORS_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=10,
+    keepalive_expiry=30.0
+)
+
+# httpx async clients are bound to the loop that opened their connections,
+# so there is one pool per live event loop.
+_clients = weakref.WeakKeyDictionary()
+
+# In-process layer over the disk cache, bounded so a long-running server does not grow with every distinct URL
+MEMORY_CACHE_SIZE = int(os.getenv("SECTORS_MEMORY_CACHE_SIZE", "1024"))
+MEMORY_CACHE_TTL = 60  # short local lifetime so entries refreshed by other processes are picked up
+_memory_cache = TTLCache(MEMORY_CACHE_SIZE, MEMORY_CACHE_TTL)
+
+# Concurrent callers asking for the same URL share one upstream request
+_single_flight = SingleFlight("sectors")
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled Sectors client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(headers=headers, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+        _clients[loop] = client
+    return client
+
+async def close_async_client():
+    """Close the pooled client of the running event loop, if any."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def _cache_get(url: str):
+    """Look up the in-process cache first, then the shared disk cache."""
+    key = normalize_url(url)
+    data = _memory_cache.get(key)
+    if data is not None:
+        return data
+
+    data = response_cache.get(url)
+    if data is not None:
+        _memory_cache.set(key, data, min(ttl_for(url), MEMORY_CACHE_TTL))
+    return data
+
+def _cache_set(url: str, data):
+    ttl = ttl_for(url)
+    _memory_cache.set(normalize_url(url), data, min(ttl, MEMORY_CACHE_TTL))
+    response_cache.set(url, data, ttl)
+
+async def _fetch(url: str) -> tuple:
+    """
+    Fetch a Sectors endpoint and return (payload, ok).
+    Errors are turned into a payload for the LLM rather than raised, ok tells whether the payload can be cached.
+    Requests go through the rate limit, adaptive concurrency limit and retry policy of the endpoint family.
+    """
+    client = get_async_client()
+    family = endpoint_family(url)
+    started = time.perf_counter()
+    status = "error"
     try:
-        response = requests.get(url, headers=headers)
+        response = await get_controller(family).send(lambda: client.get(url), url)
+        status = str(response.status_code)
         response.raise_for_status()
         data = response.json()
         logger.info(f"Data retrieved successfully from {url}")
-        return data  
-    except requests.exceptions.HTTPError as err:
-        if err.response is not None:
-            logger.error(f"HTTP error {err.response.status_code}: {err.response.text}")
-            try:
-                return err.response.json()
-            except ValueError:
-                # Response not JSON
-                return {"error": err.response.text}
-        else:
-            logger.error(f"HTTP error occurred: {err}")
-            return {"error": str(err)}
+        return data, True
+    except httpx.HTTPStatusError as err:
+        logger.error(f"HTTP error {err.response.status_code}: {err.response.text}")
+        try:
+            return err.response.json(), False
+        except ValueError:
+            # Response not JSON
+            return {"error": err.response.text}, False
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}, False
+    finally:
+        metrics.sectors_http_seconds.observe(time.perf_counter() - started, family=family, status=status)
+
+def clear_response_caches():
+    """Drop cached Sectors responses, in process and on disk."""
+    _memory_cache.clear()
+    response_cache.clear()
+
+async def aretrieve_from_endpoint(url: str) -> dict:
+    """
+    Retrieve a Sectors endpoint without blocking the event loop.
+    Successful responses are cached on disk with a per-endpoint TTL (see utils.response_cache).
+    """
+    data = _cache_get(url)
+    if data is not None:
+        logger.info(f"Cache hit for {url}")
+        metrics.cache_requests_total.inc(cache="sectors", result="hit")
+        return data
+
+    metrics.cache_requests_total.inc(cache="sectors", result="miss")
+    return await _single_flight.do(normalize_url(url), lambda: _fetch_and_cache(url))
+
+async def _fetch_and_cache(url: str) -> dict:
+    # A flight that just landed may have filled the cache between our lookup and becoming leader
+    data = _cache_get(url)
+    if data is not None:
+        return data
+
+    data, ok = await _fetch(url)
+    if ok:
+        _cache_set(url, data)
+    return data
+
+def get_coalescing_stats() -> dict:
+    """
+    Return single-flight counters for Sectors requests:
+    calls made, upstream fetches executed and calls deduplicated onto an in-flight fetch.
+    """
+    return _single_flight.stats()
+
+def retrieve_from_endpoint(url: str) -> dict:
+    """
+    Blocking facade over aretrieve_from_endpoint for sync call sites. It runs on the shared
+    async runtime, so sync callers reuse the same connection pool.
+    """
+    return async_runtime.run(aretrieve_from_endpoint(url))
@@ -0,0 +1,77 @@
+import queue
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Iterator
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop, running in a daemon thread. Everything async (HTTP pools,
+    single-flight maps, prefetch tasks) lives on it, so it survives Streamlit reruns and sessions.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True).start()
+            logger.info("Started background async runtime")
+        return _loop
+
+async def _run_in_context(context: contextvars.Context, coro):
+    # Run in the submitter's context, so e.g. an open agents trace() also covers the coroutine
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+def submit(coro) -> concurrent.futures.Future:
+    """Schedule a coroutine on the runtime loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(_run_in_context(contextvars.copy_context(), coro), get_loop())
+
+def run(coro, timeout: float = None):
+    """Run a coroutine on the runtime loop and block the calling thread until it finishes."""
+    if threading.current_thread().name == "async-runtime":
+        coro.close()
+        raise RuntimeError("async_runtime.run() would block the runtime loop on itself, await the coroutine instead")
+    return submit(coro).result(timeout)
+
+class BackgroundRun:
+    """
+    A coroutine running on the runtime loop that reports progress to the thread that started it.
+    The coroutine gets an `emit` callback; the caller iterates events() and then takes result().
+    Streamlit elements can only be created from the script thread, so rendering happens there.
+    """
+
+    _DONE = object()
+
+    def __init__(self, func: Callable[[Callable[[Any], None]], Awaitable[Any]]):
+        self._events = queue.Queue()
+        self.future = submit(self._main(func))
+
+    async def _main(self, func):
+        try:
+            return await func(self.emit)
+        finally:
+            self._events.put(self._DONE)
+
+    def emit(self, event: Any):
+        self._events.put(event)
+
+    def events(self) -> Iterator[Any]:
+        while True:
+            event = self._events.get()
+            if event is self._DONE:
+                return
+            yield event
+
+    def result(self, timeout: float = None):
+        return self.future.result(timeout)
+
+def start(func: Callable[[Callable[[Any], None]], Awaitable[Any]]) -> BackgroundRun:
+    """Start func(emit) on the runtime loop; see BackgroundRun."""
+    return BackgroundRun(func)
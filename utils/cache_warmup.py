@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from utils.api_client import aretrieve_from_endpoint
+from utils import async_runtime
+from utils.daily_range_cache import FINAL_LAG_DAYS, daily_range_cache, missing_ranges
+from utils.response_cache import endpoint_family, normalize_url, response_cache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LOG_PATH = os.getenv("WARMUP_LOG_PATH", "agentic_app.log")
+WARMUP_TOP_K = int(os.getenv("WARMUP_TOP_K", "10"))
+WARMUP_TIME_BUDGET = float(os.getenv("WARMUP_TIME_BUDGET", "20"))  # seconds
+WARMUP_LOOKBACK_DAYS = int(os.getenv("WARMUP_LOOKBACK_DAYS", "7"))
+WARMUP_DAILY_DAYS = int(os.getenv("WARMUP_DAILY_DAYS", "30"))  # daily range prefetched for hot tickers
+WARMUP_CONCURRENCY = 8
+WARMUP_MAX_LOG_BYTES = 5 * 1024 * 1024  # only the tail of the log is scanned
+
+URL_PATTERN = re.compile(r"https?://\S+/v1/\S+")
+# Every daily request logs one of these lines; the URLs of its fetches are not counted again
+DAILY_CACHE_PATTERN = re.compile(r"Daily cache (?:hit |bypassed )?for (\S+) ")
+TIMESTAMP_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+
+@dataclass
+class WarmupReport:
+    warmed: List[str] = field(default_factory=list)
+    already_cached: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Cache warm-up finished in {self.elapsed:.1f}s: {len(self.warmed)} warmed, "
+            f"{len(self.already_cached)} already cached, {len(self.failed)} failed, {len(self.timed_out)} timed out"
+        )
+
+def _read_log_tail(path: str) -> List[str]:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - WARMUP_MAX_LOG_BYTES))
+        lines = f.read().decode("utf-8", errors="replace").splitlines()
+    # The first line may be cut in half by the seek
+    return lines[1:] if size > WARMUP_MAX_LOG_BYTES else lines
+
+def find_hot_targets(log_path: str = WARMUP_LOG_PATH, top_k: int = WARMUP_TOP_K,
+                     lookback_days: int = WARMUP_LOOKBACK_DAYS) -> List[str]:
+    """
+    Return the top-K most requested targets in the recent log history.
+    Overview and top-companies requests are returned as URLs. Daily requests are returned as
+    'daily:<TICKER>', because their date ranges move every day.
+    """
+    if not os.path.exists(log_path):
+        logger.info(f"No access history found at {log_path}, skipping warm-up")
+        return []
+
+    since = datetime.now() - timedelta(days=lookback_days)
+    counts = Counter()
+    for line in _read_log_tail(log_path):
+        timestamp = TIMESTAMP_PATTERN.match(line)
+        if timestamp and datetime.fromisoformat(timestamp.group(1)) < since:
+            continue
+
+        daily = DAILY_CACHE_PATTERN.search(line)
+        if daily:
+            counts[f"daily:{daily.group(1).upper()}"] += 1
+            continue
+
+        for url in URL_PATTERN.findall(line):
+            if endpoint_family(url) in ("company_report", "companies_top"):
+                counts[normalize_url(url)] += 1
+
+    return [target for target, _ in counts.most_common(top_k)]
+
+async def _warm_target(target: str, report: WarmupReport):
+    if target.startswith("daily:"):
+        ticker = target.split(":", 1)[1]
+        end = date.today()
+        start = end - timedelta(days=WARMUP_DAILY_DAYS)
+        # The latest days are never held and are fetched on demand; only the final ones are worth warming
+        if not missing_ranges(daily_range_cache.coverage(ticker), start, end - timedelta(days=FINAL_LAG_DAYS)):
+            report.already_cached.append(target)
+            return
+        data = await daily_range_cache.get(ticker, start.isoformat(), end.isoformat())
+    else:
+        if response_cache.get(target) is not None:
+            report.already_cached.append(target)
+            return
+        data = await aretrieve_from_endpoint(target)
+
+    if isinstance(data, dict) and ("error" in data or "detail" in data):
+        report.failed.append(target)
+    else:
+        report.warmed.append(target)
+
+async def warm_up_cache(targets: Optional[List[str]] = None, time_budget: float = WARMUP_TIME_BUDGET) -> WarmupReport:
+    """
+    Prefetch the hottest Sectors endpoints into the response cache concurrently, within time_budget seconds.
+    """
+    started = time.perf_counter()
+    report = WarmupReport()
+    targets = find_hot_targets() if targets is None else targets
+    if not targets:
+        return report
+
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+    async def bounded(target):
+        async with semaphore:
+            try:
+                await _warm_target(target, report)
+            except Exception as e:
+                logger.warning(f"Warm-up of {target} failed: {e}")
+                report.failed.append(target)
+
+    tasks = {asyncio.create_task(bounded(target)): target for target in targets}
+    _, pending = await asyncio.wait(tasks, timeout=time_budget)
+    for task in pending:
+        task.cancel()
+        report.timed_out.append(tasks[task])
+
+    report.elapsed = time.perf_counter() - started
+    logger.info(report.summary())
+    return report
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+def start_cache_warmup():
+    """
+    Start the warm-up once per process on the background async runtime, without blocking the page.
+    Set WARMUP_DISABLED=1 to turn it off.
+    """
+    global _warmup_started
+    if os.getenv("WARMUP_DISABLED") == "1":
+        return None
+    with _warmup_lock:
+        if _warmup_started:
+            return None
+        _warmup_started = True
+    logger.info("Starting cache warm-up from access history...")
+    return async_runtime.submit(warm_up_cache())
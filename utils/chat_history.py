@@ -0,0 +1,107 @@
+import os
+import re
+import json
+from typing import List, Optional
+
+from utils.payload_projection import count_tokens
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Token budget of the conversation sent to the chat agents on each turn
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "4000"))
+# Most recent messages always sent as they are, whatever the budget
+CHAT_HISTORY_KEEP_MESSAGES = int(os.getenv("CHAT_HISTORY_KEEP_MESSAGES", "4"))
+# Share of the budget the summary of older turns may take; its oldest lines are dropped beyond it
+SUMMARY_BUDGET_SHARE = 0.25
+SUMMARY_LINE_CHARS = 300
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+def describe_plot(plot: dict) -> str:
+    """Short descriptor of a chart in place of its data points."""
+    x = plot.get("x") or []
+    span = f", {x[0]} to {x[-1]}" if plot.get("chart_type") == "line_chart" and x else ""
+    categories = sorted(set(plot.get("category") or []))
+    series = f", series {', '.join(categories)}" if categories else ""
+    return f"[{plot.get('chart_type', 'chart')} '{plot.get('plot_title', '')}': {len(x)} points{span}{series}]"
+
+def compact_content(content: str) -> str:
+    """Message text for the LLM: a GeneralizedOutput JSON becomes its summary plus chart descriptors."""
+    try:
+        output = json.loads(content)
+    except (TypeError, ValueError):
+        return content
+    if not isinstance(output, dict) or "summary" not in output:
+        return content
+    plots = [describe_plot(plot) for plot in output.get("plot_data") or []]
+    return "\n".join([output["summary"] or "", *plots]).strip()
+
+def _shorten(text: str, limit: int = SUMMARY_LINE_CHARS) -> str:
+    """Leading sentences of text that fit in limit characters."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    shortened = ""
+    for sentence in _SENTENCE_END.split(text):
+        if len(shortened) + len(sentence) + 1 > limit:
+            break
+        shortened = f"{shortened} {sentence}".strip()
+    return shortened or text[:limit - 3] + "..."
+
+def _truncate_tokens(text: str, tokens: int) -> str:
+    if count_tokens(text) <= tokens:
+        return text
+    return text[:max(0, tokens * 4 - 3)] + "..."
+
+class ChatHistory:
+    """
+    Token-bounded view of a chat session for the LLM. Recent messages are kept verbatim apart
+    from chart data, which becomes a short descriptor; older ones are folded into a running
+    summary sent ahead of them. Folding is incremental, each message is summarized once.
+    """
+
+    def __init__(self, max_tokens: int = CHAT_HISTORY_MAX_TOKENS, keep_messages: int = CHAT_HISTORY_KEEP_MESSAGES):
+        self.max_tokens = max_tokens
+        self.keep_messages = keep_messages
+        self.reset()
+
+    def reset(self):
+        self.summary_lines: List[str] = []
+        self.folded = 0  # messages of the session already in the summary
+
+    def _summary_message(self) -> Optional[dict]:
+        if not self.summary_lines:
+            return None
+        return {"role": "system", "content": "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines)}
+
+    def _fold(self, message: dict):
+        self.summary_lines.append(f"{message['role'].capitalize()}: {_shorten(message['content'])}")
+        self.folded += 1
+        budget = int(self.max_tokens * SUMMARY_BUDGET_SHARE)
+        while len(self.summary_lines) > 1 and count_tokens("\n".join(self.summary_lines)) > budget:
+            self.summary_lines.pop(0)
+
+    def build(self, messages: List[dict]) -> List[dict]:
+        """The messages to send for the session, within max_tokens where the kept messages allow it."""
+        if len(messages) < self.folded:
+            # The chat was cleared or replaced
+            self.reset()
+
+        recent = [{"role": message["role"], "content": compact_content(message["content"])} for message in messages[self.folded:]]
+        summary = self._summary_message()
+        tokens = sum(count_tokens(message["content"]) for message in recent) + (count_tokens(summary["content"]) if summary else 0)
+        while tokens > self.max_tokens and len(recent) > self.keep_messages:
+            self._fold(recent.pop(0))
+            summary = self._summary_message()
+            tokens = sum(count_tokens(message["content"]) for message in recent) + count_tokens(summary["content"])
+
+        if tokens > self.max_tokens and len(recent) > 1:
+            # Kept messages alone are over budget: trim the earlier ones, never the current question
+            share = max(1, (self.max_tokens - count_tokens(recent[-1]["content"])) // (len(recent) - 1))
+            recent = [{**message, "content": _truncate_tokens(message["content"], share)} for message in recent[:-1]] + recent[-1:]
+
+        if self.folded:
+            logger.info(f"Chat history: {self.folded} messages summarized, {len(recent)} sent as they are")
+        return ([summary] if summary else []) + recent
@@ -1,4 +1,6 @@
 import os
+import re
+from urllib.parse import urlsplit
 import streamlit as st
 from dotenv import load_dotenv
 import logging
@@ -31,3 +33,12 @@ def setup_sectors_api_key():
     else:
         logger.error("SECTORS_API_KEY not found in .env or Streamlit secrets.") 
         raise RuntimeError("SECTORS_API_KEY not found in .env or Streamlit secrets.")
+
+# Base URL of the Sectors API. Point it to a local stand-in (tools/sectors_stub_server.py) to work offline.
+SECTORS_BASE_URL = os.getenv("SECTORS_BASE_URL", "https://api.sectors.app/v1").rstrip("/")
+# Host (and port) of the base URL, namespacing local data that is not keyed by URL, so rows from a stand-in never serve the real API
+SECTORS_SOURCE = re.sub(r"[^A-Za-z0-9.-]+", "_", urlsplit(SECTORS_BASE_URL).netloc) or "default"
+
+# How planned steps are answered: "direct" makes a single synthesis LLM call on the results of the planned tool calls,
+# "agent" hands the results to the executor agent, which can still call tools for anything missing
+PLAN_EXECUTION_MODE = os.getenv("PLAN_EXECUTION_MODE", "direct")
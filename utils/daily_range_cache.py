@@ -0,0 +1,169 @@
+import asyncio
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from utils.api_client import aretrieve_from_endpoint
+from utils.config import SECTORS_BASE_URL, SECTORS_SOURCE
+from utils.payload_projection import observe_raw_rows
+from utils.response_cache import CACHE_PATH, connect
+from utils.timeseries_store import TimeSeriesStore, timeseries_store, to_rows
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows newer than today - FINAL_LAG_DAYS may still be published or revised,
+# so they are always fetched again instead of being marked as held.
+FINAL_LAG_DAYS = 1
+
+DateRange = Tuple[date, date]
+
+def daily_url(ticker: str, start_date: str, end_date: str) -> str:
+    return f"{SECTORS_BASE_URL}/daily/{ticker}/?start={start_date}&end={end_date}"
+
+def missing_ranges(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """Return the sub-ranges of [start, end] not held by the sorted, merged covered ranges."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+def merge_ranges(ranges: List[DateRange]) -> List[DateRange]:
+    """Merge overlapping or adjacent date ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class DailyRangeCache:
+    """
+    Per-ticker daily transaction rows plus the date ranges already fetched.
+    Rows live in the columnar TimeSeriesStore, the fetched ranges in SQLite.
+    Both are kept per Sectors source, so ranges fetched from a stand-in are never held for the real API.
+
+    A request only downloads the sub-ranges that are not held yet. The rows are merged
+    into the store, and the answer is read back from the merged series. Weekends and
+    holidays inside a fetched range count as held even though they have no rows.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, store: TimeSeriesStore = timeseries_store, source: str = SECTORS_SOURCE):
+        self.path = path
+        self.store_backend = store
+        self.source = source
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(daily_coverage)")]
+            if columns and "source" not in columns:
+                # Coverage recorded before it was kept per source cannot be attributed, fetch it again
+                conn.execute("DROP TABLE daily_coverage")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily_coverage (source TEXT NOT NULL, ticker TEXT NOT NULL, "
+                "start_date TEXT NOT NULL, end_date TEXT NOT NULL, PRIMARY KEY (source, ticker, start_date))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def coverage(self, ticker: str) -> List[DateRange]:
+        rows = self._connection().execute(
+            "SELECT start_date, end_date FROM daily_coverage WHERE source = ? AND ticker = ? ORDER BY start_date",
+            (self.source, ticker)
+        ).fetchall()
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in rows]
+
+    def rows(self, ticker: str, start: date, end: date) -> List[dict]:
+        return to_rows(self.store_backend.range(ticker, start, end))
+
+    def store(self, ticker: str, rows: List[dict], fetched: Optional[DateRange]):
+        """
+        Upsert rows and mark the fetched range as held.
+        The SQLite write lock serializes writers across processes, so merges are not lost.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.store_backend.upsert(ticker, rows)
+            if fetched is not None:
+                # Re-read inside the transaction, another process may have extended the coverage
+                merged = merge_ranges(self.coverage(ticker) + [fetched])
+                conn.execute("DELETE FROM daily_coverage WHERE source = ? AND ticker = ?", (self.source, ticker))
+                conn.executemany(
+                    "INSERT INTO daily_coverage (source, ticker, start_date, end_date) VALUES (?, ?, ?, ?)",
+                    [(self.source, ticker, start.isoformat(), end.isoformat()) for start, end in merged]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        """Forget the fetched ranges, so every range is downloaded again. Stored rows are overwritten on refetch."""
+        self._connection().execute("DELETE FROM daily_coverage WHERE source = ?", (self.source,))
+
+    async def _fill(self, ticker: str, gap: DateRange, last_final_day: date):
+        start, end = gap
+        data = await aretrieve_from_endpoint(daily_url(ticker, start.isoformat(), end.isoformat()))
+        if not isinstance(data, list):
+            return data  # error payload from the API
+        observe_raw_rows("get_daily_transaction", data)
+
+        final_end = min(end, last_final_day)
+        fetched = (start, final_end) if start <= final_end else None
+        # The write lock wait and the file rewrite would stall every session on the shared loop
+        await asyncio.to_thread(self.store, ticker, data, fetched)
+        return None
+
+    async def get(self, ticker: str, start_date: str, end_date: str):
+        """
+        Return daily transaction rows of a ticker between start_date and end_date (inclusive),
+        fetching only the dates not held locally.
+        """
+        ticker = ticker.upper()
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        if start > end:
+            start, end = end, start
+
+        gaps = missing_ranges(self.coverage(ticker), start, end)
+        if gaps:
+            logger.info(f"Daily cache for {ticker} {start}..{end}: fetching {len(gaps)} missing range(s) {gaps}")
+            last_final_day = date.today() - timedelta(days=FINAL_LAG_DAYS)
+            errors = await asyncio.gather(*[self._fill(ticker, gap, last_final_day) for gap in gaps])
+            errors = [error for error in errors if error is not None]
+            if errors:
+                return errors[0]
+        else:
+            logger.info(f"Daily cache hit for {ticker} {start}..{end}")
+
+        return self.rows(ticker, start, end)
+
+daily_range_cache = DailyRangeCache()
+
+async def get_daily_range(ticker: str, start_date: str, end_date: str):
+    """
+    Get daily transaction rows for a ticker, served from the gap-filling cache.
+    Falls back to a plain request if the dates cannot be parsed.
+    """
+    try:
+        return await daily_range_cache.get(ticker, start_date, end_date)
+    except ValueError as e:
+        logger.warning(f"Daily cache bypassed for {ticker} {start_date}..{end_date}: {e}")
+        return await aretrieve_from_endpoint(daily_url(ticker, start_date, end_date))
@@ -0,0 +1,22 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+
+# IDX trades on Jakarta time (UTC+7, no daylight saving); Sectors publishes the day's data after the close
+JAKARTA = timezone(timedelta(hours=7))
+DATA_REFRESH_HOUR = int(os.getenv("SECTORS_DATA_REFRESH_HOUR", "18"))
+
+def data_date(now: datetime = None) -> date:
+    """
+    The latest trading day whose data Sectors has published: today after the refresh hour,
+    otherwise the previous weekday. Exchange holidays are not modelled, on those days the
+    version simply changes without new data.
+    """
+    now = (now or datetime.now(timezone.utc)).astimezone(JAKARTA)
+    day = now.date() if now.hour >= DATA_REFRESH_HOUR else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+def data_version() -> str:
+    """Version of the Sectors data, part of the keys of caches holding answers derived from it."""
+    return data_date().isoformat()
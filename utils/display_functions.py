@@ -2,6 +2,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from schemas.finance_app import TextOnlyOutput, AnalysisWithPlotOutput, GeneralizedOutput
+from utils.downsampling import downsample_xy, PLOT_POINT_BUDGET
+from utils.streaming import StreamUpdate
+from utils.usage_budget import forward_budgeted_stream
+from utils import async_runtime
+from utils.config import PLAN_EXECUTION_MODE
+from utils.chat_history import ChatHistory
 
 def set_title(title_text= "IDX AI Assistant", title_icon= "📈"):
     """Set the title and configuration for the Streamlit app."""
@@ -49,6 +55,16 @@ def set_sidebar():
     💻 **Source Code**: [GitHub Repository](https://github.com/miqbalrp/agentic-ai)
     """)
 
+def display_streaming_toggle():
+    """Display a sidebar toggle to stream agent responses as they are generated."""
+    st.sidebar.toggle("Stream responses", value=True, key="stream_responses",
+                      help="Show tool calls and the answer while the agents are still working.")
+
+def display_execution_mode_toggle():
+    """Display a sidebar toggle to run planned tool calls directly instead of through the executor agent."""
+    st.sidebar.toggle("Direct plan execution", value=PLAN_EXECUTION_MODE == "direct", key="direct_execution",
+                      help="Run the planned tool calls as they are and use a single LLM call to write the answer.")
+
 def initialize_session_state():
     """Initialize session state variables for user input and query execution."""
     if "user_input" not in st.session_state:
@@ -62,6 +78,8 @@ def initialize_chat_history():
     """Initialize chat history in the session state."""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = ChatHistory()  # What of the messages is sent to the LLM
 
 def generate_chat_id():
         """Generate a unique chat ID for the session."""
@@ -78,6 +96,7 @@ def display_clear_chat_button():
     
     if st.button("Clear Chat"):
         st.session_state.messages = []
+        st.session_state.chat_context.reset()
         st.rerun()  # Rerun the app to reflect the cleared chat history
 
 def display_single_message(role, content):
@@ -155,9 +174,14 @@ def display_analysis_with_plot_output(plot_data):
         x_axis_label = dataset.x_axis_title
         y_axis_label = dataset.y_axis_title
 
+        x_data, y_data = dataset.x, dataset.y
+        if dataset.chart_type == 'line_chart':
+            # Long series are reduced with LTTB, which keeps the shape and the extremes
+            x_data, y_data = downsample_xy(x_data, y_data, PLOT_POINT_BUDGET)
+
         df = pd.DataFrame({
-            "x_data": dataset.x,
-            "y_data": dataset.y
+            "x_data": x_data,
+            "y_data": y_data
             }
         )
 
@@ -166,7 +190,7 @@ def display_analysis_with_plot_output(plot_data):
                 df, 
                 x="x_data", 
                 y="y_data", 
-                markers=True, 
+                markers=len(df) <= 100,  # markers only help on short series
                 labels={'x_data': x_axis_label, 'y_data': y_axis_label},
                 title=plot_title
                 )
@@ -184,3 +208,78 @@ def display_analysis_with_plot_output(plot_data):
                 category_orders={'y_data': y_label_order}
                 )
             st.plotly_chart(fig, key=str(uuid.uuid4()))  # Use a unique key to avoid Streamlit caching issues
+
+def display_final_output(output):
+    """Render a GeneralizedOutput: the summary followed by its plots. Other outputs are written as they are."""
+    display_agent_response_title()
+    if isinstance(output, GeneralizedOutput):
+        st.write(output.summary)
+        if output.plot_data:
+            display_analysis_with_plot_output(output.plot_data)
+    else:
+        st.write(output)
+
+def display_usage(usage: dict):
+    """Show the LLM usage of the answered query under the answer."""
+    st.caption(
+        f"{usage['total_tokens']:,} tokens ({usage['input_tokens']:,} in, {usage['output_tokens']:,} out) · "
+        f"{usage['llm_turns']} LLM turns in {usage['agent_runs']} agent runs · {usage['seconds']:.1f}s"
+    )
+
+class StreamedResponseView:
+    """Show a streamed agent run: tool progress in a status box and the summary as it is generated."""
+
+    def __init__(self):
+        self.status = st.status("Working on it...", expanded=False)
+        self.summary_placeholder = st.empty()
+
+    def update(self, update: StreamUpdate):
+        if update.kind == "agent":
+            self.status.write(f"🤖 {update.name}")
+        elif update.kind == "tool_called":
+            self.status.update(label=f"Calling {update.name}...")
+            self.status.write(f"🔧 `{update.name}` {update.text}")
+        elif update.kind == "tool_output":
+            self.status.write(f"✅ `{update.name}` finished")
+        elif update.kind == "text":
+            self.summary_placeholder.markdown(update.text)
+
+    def fail(self):
+        self.status.update(label="Failed", state="error")
+
+    def complete(self, final_output):
+        """Replace the streamed text with the final summary and add the plots."""
+        self.status.update(label="Done", state="complete")
+        if isinstance(final_output, GeneralizedOutput):
+            self.summary_placeholder.markdown(final_output.summary)
+            if final_output.plot_data:
+                display_analysis_with_plot_output(final_output.plot_data)
+        else:
+            self.summary_placeholder.markdown(str(final_output))
+        return final_output
+
+def display_streamed_response(run):
+    """Render a streamed agent run: tool progress as it happens, the summary as it is generated, and plots once the output is complete.
+    The run itself executes on the background async runtime; rendering stays in the script thread.
+    A run stopped by the query budget or its max turns shows the results gathered so far.
+
+    Args:
+        run: awaitable returning the RunResultStreaming of Runner.run_streamed.
+
+    Returns:
+        The final output of the run.
+    """
+    view = StreamedResponseView()
+
+    async def forward(emit):
+        return await forward_budgeted_stream(await run, emit)
+
+    background = async_runtime.start(forward)
+    for update in background.events():
+        view.update(update)
+    try:
+        final_output = background.result()
+    except Exception:
+        view.fail()
+        raise
+    return view.complete(final_output)
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+# Point budgets for the series handed to the model and for rendered charts
+SERIES_POINT_BUDGET = int(os.getenv("SERIES_POINT_BUDGET", "60"))
+PLOT_POINT_BUDGET = int(os.getenv("PLOT_POINT_BUDGET", "500"))
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` indices that keep the visual shape of (x, y).
+    The first and last points are always kept. So are the global minimum and maximum of y,
+    which LTTB alone can drop. x must be sorted.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(y)
+    if not finite.all():
+        # Gaps would poison the triangle areas, fill them from the neighbours for selection only
+        y = np.interp(np.arange(n), np.flatnonzero(finite), y[finite]) if finite.any() else np.zeros(n)
+
+    # Interior points split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+
+    extremes = [int(np.argmin(y)), int(np.argmax(y))]
+    return np.unique(np.concatenate([selected, extremes]))
+
+def downsample_rows(rows: list, columns, threshold: int = SERIES_POINT_BUDGET) -> list:
+    """
+    Downsample date-sorted API rows to at most `threshold` points, keeping the union of the points
+    LTTB selects for each column, so every metric keeps its shape and extremes. Each column gets
+    an equal share of the budget, its two extremes included.
+    """
+    if len(rows) <= threshold:
+        return rows
+    x = np.array([str(row["date"])[:10] for row in rows], dtype="datetime64[D]").astype(np.int64)
+    per_column = max(3, threshold // max(1, len(columns)) - 2)
+    keep = set()
+    for column in columns:
+        y = np.array([np.nan if row.get(column) is None else float(row[column]) for row in rows])
+        if np.isfinite(y).any():
+            keep.update(lttb_indices(x, y, per_column).tolist())
+    return [rows[i] for i in sorted(keep)]
+
+def downsample_xy(x: list, y: list, threshold: int = PLOT_POINT_BUDGET):
+    """Downsample a chart trace. x may be dates or numbers; other x values are treated as positions."""
+    if len(x) <= threshold or len(x) != len(y):
+        return x, y
+    try:
+        x_numeric = np.array(x, dtype="datetime64[D]").astype(np.int64)
+    except (TypeError, ValueError):
+        try:
+            x_numeric = np.array(x, dtype=np.float64)
+        except (TypeError, ValueError):
+            x_numeric = np.arange(len(x), dtype=np.float64)
+    try:
+        y_numeric = np.array(y, dtype=np.float64)
+    except (TypeError, ValueError):
+        return x, y
+    order = np.argsort(x_numeric, kind="stable")
+    keep = order[lttb_indices(x_numeric[order], y_numeric[order], threshold)]
+    return [x[i] for i in keep], [y[i] for i in keep]
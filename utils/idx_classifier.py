@@ -0,0 +1,113 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Literal, Optional, Tuple
+
+from utils.ticker_index import ticker_index
+from utils.ttl_cache import TTLCache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALLOW_THRESHOLD = float(os.getenv("IDX_CLASSIFIER_ALLOW_THRESHOLD", "3"))
+BLOCK_THRESHOLD = float(os.getenv("IDX_CLASSIFIER_BLOCK_THRESHOLD", "-3"))
+VERDICT_CACHE_SIZE = int(os.getenv("GUARDRAIL_VERDICT_CACHE_SIZE", "2048"))
+VERDICT_CACHE_TTL = float(os.getenv("GUARDRAIL_VERDICT_CACHE_TTL", "86400"))
+
+# Weighted phrases; positive weights point to the Indonesian market, negative ones away from it
+IDX_TERMS = {
+    "idx": 4, "bei": 3, "bursa efek indonesia": 4, "indonesia stock exchange": 4, "indonesian stock": 4,
+    "ihsg": 4, "jci": 3, "lq45": 4, "idx30": 4, "idx80": 4, "kompas100": 4, "emiten": 3, "tbk": 3,
+    "saham": 2, "indonesia": 2, "indonesian": 2, "rupiah": 1.5, "idr": 1.5,
+}
+FINANCE_TERMS = {
+    "stock", "stocks", "share", "shares", "price", "market cap", "dividend", "earnings", "revenue", "volume",
+    "closing", "ticker", "company", "companies", "sector", "subsector", "industry", "ranked", "ranking", "top",
+    "pe", "pb", "ps", "ratio", "trend", "transaction", "overview", "listed", "listing", "performance",
+}
+FINANCE_TERM_WEIGHT = 0.5
+FINANCE_TERMS_CAP = 1.5
+FOREIGN_TERMS = {
+    "nasdaq": -4, "nyse": -4, "s&p": -3, "s&p 500": -4, "dow jones": -4, "nikkei": -4, "ftse": -4,
+    "hang seng": -4, "sgx": -3, "bursa malaysia": -4, "wall street": -3, "apple": -3, "tesla": -3,
+    "microsoft": -3, "amazon": -3, "nvidia": -3, "google": -3, "meta": -2, "bitcoin": -3, "ethereum": -3,
+    "crypto": -3, "forex": -2,
+}
+OFF_TOPIC_TERMS = {
+    "recipe": -4, "weather": -4, "poem": -4, "joke": -4, "movie": -3, "song": -3, "football": -3,
+    "translate": -3, "homework": -3, "python": -3, "javascript": -3,
+}
+KNOWN_COMPANY_WEIGHT = 4
+UNKNOWN_TICKER_WEIGHT = 1
+
+TICKER_TOKEN = re.compile(r"\b([A-Z]{4})(?:\.JK)?\b")
+_PUNCTUATION = re.compile(r"[^\w&.\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+Decision = Literal["allow", "block", "ambiguous"]
+
+@dataclass
+class Verdict:
+    decision: Decision
+    score: float
+    reason: str
+
+def normalize_query(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace, so trivially different queries share a key."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+def _phrase_hits(normalized: str, terms) -> List[str]:
+    padded = f" {normalized} "
+    return [term for term in terms if f" {term} " in padded]
+
+def classify_query(text: str) -> Verdict:
+    """
+    Score a query with the ticker index and the IDX lexicon. Clear cases are decided locally:
+    "allow" for queries about IDX companies or the Indonesian market, "block" for queries about
+    other markets or unrelated topics. Mixed or weak signals are "ambiguous" and go to the LLM.
+    """
+    normalized = normalize_query(text)
+    score = 0.0
+    signals = []
+
+    # Companies from the ticker index, by ticker, name or alias
+    known = ticker_index.find_mentions(text)
+    listed_suffix = ".jk" in normalized
+    if known or listed_suffix:
+        score += KNOWN_COMPANY_WEIGHT
+        signals.append(f"IDX companies {', '.join(known) or 'with the .JK suffix'}")
+    elif TICKER_TOKEN.search(text):
+        score += UNKNOWN_TICKER_WEIGHT
+
+    idx_terms = _phrase_hits(normalized, IDX_TERMS)
+    if idx_terms:
+        score += max(IDX_TERMS[term] for term in idx_terms)
+        signals.append(f"IDX terms {', '.join(idx_terms)}")
+
+    score += min(FINANCE_TERMS_CAP, FINANCE_TERM_WEIGHT * len(_phrase_hits(normalized, FINANCE_TERMS)))
+
+    negative = _phrase_hits(normalized, FOREIGN_TERMS) + _phrase_hits(normalized, OFF_TOPIC_TERMS)
+    if negative:
+        score += min({**FOREIGN_TERMS, **OFF_TOPIC_TERMS}[term] for term in negative)
+        signals.append(f"non-IDX terms {', '.join(negative)}")
+
+    if score >= ALLOW_THRESHOLD and not negative:
+        return Verdict("allow", score, f"Query mentions {'; '.join(signals)}.")
+    if score <= BLOCK_THRESHOLD and not (known or listed_suffix or idx_terms):
+        return Verdict("block", score, f"Query is about {'; '.join(signals)}, not companies listed on IDX.")
+    return Verdict("ambiguous", score, "; ".join(signals) or "No clear signal.")
+
+class VerdictCache(TTLCache):
+    """LRU/TTL cache of guardrail verdicts keyed on the normalized query."""
+
+    def __init__(self, maxsize: int = VERDICT_CACHE_SIZE, ttl: float = VERDICT_CACHE_TTL):
+        super().__init__(maxsize, ttl)
+
+    def get(self, query: str) -> Optional[Tuple[bool, str]]:
+        return super().get(normalize_query(query))
+
+    def set(self, query: str, verdict: Tuple[bool, str]):
+        super().set(normalize_query(query), verdict)
+
+verdict_cache = VerdictCache()
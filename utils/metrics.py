@@ -0,0 +1,298 @@
+import os
+import time
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from agents import add_trace_processor
+from agents.tracing import Span, Trace, TracingProcessor
+from agents.tracing.span_data import (
+    AgentSpanData,
+    FunctionSpanData,
+    GenerationSpanData,
+    GuardrailSpanData,
+    HandoffSpanData,
+    ResponseSpanData,
+)
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Port of the local Prometheus scrape endpoint (http://host:port/metrics); unset to disable it
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _le(bound) -> str:
+    return f'le="{bound}"'
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Gauge:
+    """Current value per label set, e.g. a limit that goes up and down."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative histogram per label set, rendered with _bucket, _sum and _count series."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+            return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, _le(bound))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, _le('+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+registry = MetricsRegistry()
+
+workflow_seconds = registry.histogram("agentic_workflow_seconds", "Duration of a traced workflow, e.g. one answered query.", ("workflow",))
+workflows_total = registry.counter("agentic_workflows_total", "Traced workflows finished.", ("workflow",))
+pipeline_stage_seconds = registry.histogram("agentic_pipeline_stage_seconds", "Duration of a query pipeline stage.", ("stage",))
+guardrail_seconds = registry.histogram("agentic_guardrail_seconds", "Duration of an input guardrail check.", ("guardrail", "triggered"))
+agent_run_seconds = registry.histogram("agentic_agent_run_seconds", "Duration of an agent run, including its tools.", ("agent",))
+llm_seconds = registry.histogram("agentic_llm_seconds", "Duration of an LLM call.", ("agent", "model"))
+llm_tokens_total = registry.counter("agentic_llm_tokens_total", "LLM tokens used.", ("agent", "model", "kind"))
+tool_seconds = registry.histogram("agentic_tool_seconds", "Duration of a function tool call.", ("agent", "tool"))
+handoffs_total = registry.counter("agentic_handoffs_total", "Handoffs between agents.", ("from_agent", "to_agent"))
+sectors_http_seconds = registry.histogram("agentic_sectors_http_seconds", "Duration of a Sectors API request, retries included.", ("family", "status"))
+sectors_rate_wait_seconds = registry.histogram("agentic_sectors_rate_wait_seconds", "Time a Sectors API attempt waited for the rate limit.", ("family",))
+sectors_retries_total = registry.counter("agentic_sectors_retries_total", "Sectors API attempts retried, by what failed (throttled, server_error, transport_error).", ("family", "reason"))
+sectors_throttled_total = registry.counter("agentic_sectors_throttled_total", "Sectors API responses with HTTP 429.", ("family",))
+sectors_gave_up_total = registry.counter("agentic_sectors_gave_up_total", "Sectors API requests that failed after their last attempt.", ("family",))
+sectors_concurrency_limit = registry.gauge("agentic_sectors_concurrency_limit", "Current adaptive concurrency limit of Sectors API requests.", ("family",))
+sectors_in_flight = registry.gauge("agentic_sectors_in_flight", "Sectors API requests in flight.", ("family",))
+model_routes_total = registry.counter("agentic_model_routes_total", "Model tier picked per agent run; applied is false for pinned models.", ("agent", "tier", "applied"))
+cache_requests_total = registry.counter("agentic_cache_requests_total", "Cache lookups by cache and result (hit, miss, local).", ("cache", "result"))
+
+def _duration(span: Span) -> Optional[float]:
+    if not span.started_at or not span.ended_at:
+        return None
+    return (datetime.fromisoformat(span.ended_at) - datetime.fromisoformat(span.started_at)).total_seconds()
+
+class MetricsProcessor(TracingProcessor):
+    """
+    Agents SDK tracing processor that turns spans into metrics: agent runs, LLM calls and
+    their tokens, tool calls, guardrails and handoffs, labelled with the agent they belong to.
+    Spans are only produced while tracing is enabled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, str] = {}  # open agent span id -> agent name
+        self._traces: Dict[str, float] = {}  # open trace id -> start time
+
+    def _agent_of(self, span: Span) -> str:
+        with self._lock:
+            return self._agents.get(span.parent_id, "unknown")
+
+    def on_trace_start(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = time.perf_counter()
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with self._lock:
+            started = self._traces.pop(trace.trace_id, None)
+        if started is not None:
+            workflow_seconds.observe(time.perf_counter() - started, workflow=trace.name)
+            workflows_total.inc(workflow=trace.name)
+
+    def on_span_start(self, span: Span) -> None:
+        if isinstance(span.span_data, AgentSpanData):
+            with self._lock:
+                self._agents[span.span_id] = span.span_data.name
+
+    def on_span_end(self, span: Span) -> None:
+        data = span.span_data
+        seconds = _duration(span)
+        if isinstance(data, AgentSpanData):
+            with self._lock:
+                self._agents.pop(span.span_id, None)
+            if seconds is not None:
+                agent_run_seconds.observe(seconds, agent=data.name)
+        elif isinstance(data, ResponseSpanData):
+            response = data.response
+            model = getattr(response, "model", None) or "unknown"
+            self._observe_llm(span, seconds, model, getattr(response, "usage", None) and {
+                "input": response.usage.input_tokens, "output": response.usage.output_tokens
+            })
+        elif isinstance(data, GenerationSpanData):
+            usage = data.usage or {}
+            self._observe_llm(span, seconds, data.model or "unknown", usage and {
+                "input": usage.get("input_tokens", 0), "output": usage.get("output_tokens", 0)
+            })
+        elif isinstance(data, FunctionSpanData):
+            if seconds is not None:
+                tool_seconds.observe(seconds, agent=self._agent_of(span), tool=data.name)
+        elif isinstance(data, GuardrailSpanData):
+            if seconds is not None:
+                guardrail_seconds.observe(seconds, guardrail=data.name, triggered=str(data.triggered).lower())
+        elif isinstance(data, HandoffSpanData):
+            handoffs_total.inc(from_agent=data.from_agent or "unknown", to_agent=data.to_agent or "unknown")
+
+    def _observe_llm(self, span: Span, seconds: Optional[float], model: str, tokens: Optional[dict]):
+        agent = self._agent_of(span)
+        if seconds is not None:
+            llm_seconds.observe(seconds, agent=agent, model=model)
+        for kind, count in (tokens or {}).items():
+            llm_tokens_total.inc(count or 0, agent=agent, model=model, kind=kind)
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self) -> None:
+        pass
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = 0) -> ThreadingHTTPServer:
+    """Serve /metrics in a background thread. The bound port is server.server_port."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{server.server_port}/metrics")
+    return server
+
+_installed = False
+_install_lock = threading.Lock()
+
+def install_metrics(port: Optional[int] = None) -> bool:
+    """
+    Register the metrics tracing processor and, when a port is given or METRICS_PORT is set,
+    start the scrape endpoint. Safe to call on every Streamlit rerun; only the first call acts.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return False
+        add_trace_processor(MetricsProcessor())
+        port = port if port is not None else (int(METRICS_PORT) if METRICS_PORT else None)
+        if port is not None:
+            try:
+                start_metrics_server(port=port)
+            except OSError as e:
+                # Another process (e.g. a second Streamlit server) already serves this port
+                logger.warning(f"Metrics endpoint not started on port {port}: {e}")
+        _installed = True
+        return True
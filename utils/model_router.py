@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import queue
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from agents import Agent
+from agents.tracing import get_current_trace
+
+from utils.ticker_index import ticker_index
+from utils import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Agents without a pinned model run on the small tier when their query is simple enough
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "1") != "0"
+MODEL_TIER_SMALL = os.getenv("MODEL_TIER_SMALL", "gpt-4o-mini")
+MODEL_TIER_LARGE = os.getenv("MODEL_TIER_LARGE") or None  # None keeps the SDK default model
+SMALL_MAX_SCORE = float(os.getenv("MODEL_ROUTING_SMALL_MAX_SCORE", "1"))
+# Routing decisions, queries included, are appended here as JSON lines for offline evaluation; off unless set
+ROUTING_LOG_PATH = os.getenv("MODEL_ROUTING_LOG", "")
+
+# Phrases hinting at which tool a query needs
+INTENT_TERMS = {
+    "overview": ("overview", "profile", "summary", "about", "what does", "business"),
+    "trend": ("trend", "daily", "price", "prices", "volume", "closing", "transaction", "performance", "movement"),
+    "ranking": ("top", "rank", "ranked", "ranking", "largest", "highest", "biggest", "best"),
+}
+# Phrases asking for reasoning over the data rather than restating it
+REASONING_TERMS = (
+    "compare", "comparison", "versus", "vs", "why", "explain", "correlation", "relationship", "impact",
+    "forecast", "predict", "recommend", "should i", "difference", "better",
+)
+REASONING_WEIGHT = 2
+FAN_OUT_WEIGHT = 2
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+@dataclass
+class Complexity:
+    """Cheap signals of how much work a query needs; score is roughly the number of tool calls."""
+    tickers: int = 0
+    intents: List[str] = field(default_factory=list)
+    expected_tools: int = 1
+    plan_steps: Optional[int] = None
+    fan_out: bool = False
+    reasoning: bool = False
+
+    @property
+    def score(self) -> float:
+        return self.expected_tools + REASONING_WEIGHT * self.reasoning + FAN_OUT_WEIGHT * self.fan_out
+
+def _has_phrase(words: str, phrase: str) -> bool:
+    return f" {phrase} " in words
+
+def score_query(text: str, plan=None) -> Complexity:
+    """
+    Score a query from the companies it mentions, the kinds of tool it needs and, once the
+    planner ran, the length of its plan. No LLM call is made.
+    """
+    words = f" {' '.join(_WORDS.findall(text.lower()))} "
+    tickers = len(ticker_index.find_mentions(text))
+    intents = [intent for intent, terms in INTENT_TERMS.items() if any(_has_phrase(words, term) for term in terms)]
+    # Company tools run once per company, the ranking once
+    per_company = len([intent for intent in intents if intent != "ranking"])
+    expected_tools = max(1, per_company * max(1, tickers) + ("ranking" in intents))
+    complexity = Complexity(
+        tickers=tickers,
+        intents=intents,
+        expected_tools=expected_tools,
+        reasoning=any(_has_phrase(words, term) for term in REASONING_TERMS),
+    )
+    if plan:
+        complexity.plan_steps = len(plan)
+        complexity.expected_tools = len(plan)
+        complexity.fan_out = any(step.for_each_ticker_from for step in plan)
+    return complexity
+
+def _input_text(input) -> str:
+    """The text to score: the input itself, or the last user message of a conversation."""
+    if isinstance(input, str):
+        return input
+    for message in reversed(input or []):
+        if isinstance(message, dict) and message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+class RoutingLog:
+    """Append-only JSONL log of routing decisions, written by a background thread so agent runs never wait on the file."""
+
+    def __init__(self, path: Optional[str] = ROUTING_LOG_PATH):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write(self, decision: dict):
+        if not self.path:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="routing-log", daemon=True)
+                self._writer.start()
+        self._queue.put(decision)
+
+    def _drain(self):
+        while True:
+            lines = [json.dumps(self._queue.get())]
+            while not self._queue.empty():
+                lines.append(json.dumps(self._queue.get()))
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in lines))
+            except OSError as e:
+                logger.warning(f"{len(lines)} routing decision(s) not logged to {self.path}: {e}")
+
+routing_log = RoutingLog()
+
+def _tier_model(tier: str) -> Optional[str]:
+    return MODEL_TIER_SMALL if tier == "small" else MODEL_TIER_LARGE
+
+def _with_model(agent: Agent, model: Optional[str], depth: int = 0) -> Agent:
+    """Copy of the agent and of the agents it hands off to, with the model set where none is pinned."""
+    handoffs = [
+        _with_model(target, model, depth + 1) if isinstance(target, Agent) and depth < 3 else target
+        for target in agent.handoffs
+    ]
+    return agent.clone(model=agent.model if agent.model is not None else model, handoffs=handoffs)
+
+def route_agent(agent: Agent, input, complexity: Optional[Complexity] = None) -> Agent:
+    """
+    Pick the model tier for one agent run and return the agent to run. Agents with a pinned
+    model keep it, as do the ones they hand off to. The decision is logged either way, with
+    `applied` telling whether it changed the model.
+    """
+    if not MODEL_ROUTING:
+        return agent
+    text = _input_text(input)
+    complexity = complexity or score_query(text)
+    tier = "small" if complexity.score <= SMALL_MAX_SCORE else "large"
+    model = _tier_model(tier)
+    routable = agent.model is None or any(isinstance(target, Agent) and target.model is None for target in agent.handoffs)
+    applied = routable and model is not None
+
+    trace = get_current_trace()
+    metrics.model_routes_total.inc(agent=agent.name, tier=tier, applied=str(applied).lower())
+    routing_log.write({
+        "time": time.time(),
+        "trace_id": trace.trace_id if trace else None,
+        "agent": agent.name,
+        "tier": tier,
+        "model": model if applied else (agent.model if isinstance(agent.model, str) else None),
+        "applied": applied,
+        "score": complexity.score,
+        "signals": asdict(complexity),
+        "query": text[:500],
+    })
+    logger.info(f"Routed {agent.name} to the {tier} tier (score {complexity.score:g}, applied={applied})")
+    return _with_model(agent, model) if applied else agent
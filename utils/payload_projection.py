@@ -0,0 +1,153 @@
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional, fall back to the usual 4 characters per token estimate
+    _encoding = None
+
+# Fields each agent's instructions actually use
+COMPANY_OVERVIEW_FIELDS = [
+    "symbol",
+    "company_name",
+    "overview.sector",
+    "overview.sub_sector",
+    "overview.industry",
+    "overview.sub_industry",
+    "overview.listing_board",
+    "overview.listing_date",
+    "overview.market_cap",
+    "overview.market_cap_rank",
+    "overview.employee_num",
+    "overview.last_close_price",
+    "overview.latest_close_date",
+    "overview.daily_close_change",
+    "overview.website",
+]
+DAILY_TRANSACTION_COLUMNS = ["date", "close", "volume", "market_cap"]
+TOP_COMPANIES_COLUMNS = ["rank", "symbol", "company_name", "value"]
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def _format_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.6g}"
+    return str(value).replace("\n", " ")
+
+def _get_path(payload: dict, path: str):
+    value = payload
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def to_table(columns: Sequence[str], rows: List[Sequence]) -> str:
+    """Encode rows as a header line plus comma-separated values, the cheapest tabular form for the model."""
+    lines = [",".join(columns)]
+    for row in rows:
+        lines.append(",".join(_format_value(value).replace(",", ";") for value in row))
+    return "\n".join(lines)
+
+def project_company_overview(payload: dict) -> str:
+    lines = []
+    for path in COMPANY_OVERVIEW_FIELDS:
+        value = _get_path(payload, path)
+        if value not in (None, ""):
+            lines.append(f"{path.split('.')[-1]}: {_format_value(value)}")
+    return "\n".join(lines)
+
+def project_daily_transaction(rows: list) -> str:
+    return to_table(DAILY_TRANSACTION_COLUMNS, [[row.get(name) for name in DAILY_TRANSACTION_COLUMNS] for row in rows])
+
+def project_top_companies(payload: dict) -> str:
+    sections = []
+    for classification, companies in payload.items():
+        rows = [
+            [rank, company.get("symbol"), company.get("company_name"), company.get(classification)]
+            for rank, company in enumerate(companies, start=1)
+        ]
+        sections.append(f"classification: {classification}\n" + to_table(TOP_COMPANIES_COLUMNS, rows))
+    return "\n\n".join(sections)
+
+# Projection per tool, keyed by function tool name
+PROJECTIONS: Dict[str, Callable] = {
+    "get_company_overview": project_company_overview,
+    "get_daily_transaction": project_daily_transaction,
+    "get_top_companies_ranked_by_classification": project_top_companies,
+}
+
+_report_lock = threading.Lock()
+_report = {}
+_raw_rows = {}  # tool name -> [tokens, rows] of row payloads as the API returned them
+
+def observe_raw_rows(tool_name: str, rows: list):
+    """
+    Record the size of a row payload straight from the API, before it is stored or projected.
+    Rows served later from a local store are then measured at this size per row.
+    """
+    if not isinstance(rows, list) or not rows:
+        return
+    tokens = count_tokens(json.dumps(rows))
+    with _report_lock:
+        entry = _raw_rows.setdefault(tool_name, [0, 0])
+        entry[0] += tokens
+        entry[1] += len(rows)
+
+def _raw_tokens(tool_name: str, payload, raw_rows: Optional[int]) -> int:
+    if raw_rows is not None:
+        with _report_lock:
+            tokens, rows = _raw_rows.get(tool_name, (0, 0))
+        if rows:
+            return round(tokens / rows * raw_rows)
+    return count_tokens(json.dumps(payload))
+
+def is_error_payload(payload) -> bool:
+    return not payload or isinstance(payload, dict) and ("error" in payload or "detail" in payload)
+
+def project(tool_name: str, payload, raw_rows: Optional[int] = None):
+    """
+    Reduce a Sectors payload to the fields the tool's agent needs, in a compact text encoding.
+    Error payloads, and payloads of an unexpected shape, are passed through unchanged.
+    For rows read from a local store, raw_rows is the number of rows the API would have returned,
+    so the report measures the raw payload (see observe_raw_rows) rather than the stored one.
+    """
+    if is_error_payload(payload):
+        return payload
+    try:
+        projected = PROJECTIONS[tool_name](payload)
+    except (AttributeError, KeyError, TypeError) as e:
+        logger.warning(f"Projection for {tool_name} skipped, unexpected payload shape: {e}")
+        return payload
+
+    raw_tokens = _raw_tokens(tool_name, payload, raw_rows)
+    projected_tokens = count_tokens(projected)
+    with _report_lock:
+        entry = _report.setdefault(tool_name, {"calls": 0, "raw_tokens": 0, "projected_tokens": 0})
+        entry["calls"] += 1
+        entry["raw_tokens"] += raw_tokens
+        entry["projected_tokens"] += projected_tokens
+    logger.info(f"Projected {tool_name} payload: {raw_tokens} -> {projected_tokens} tokens")
+    return projected
+
+def projection_report() -> Dict[str, dict]:
+    """Return before/after token counts per tool since the process started."""
+    with _report_lock:
+        report = {tool: dict(entry) for tool, entry in _report.items()}
+    for entry in report.values():
+        raw = entry["raw_tokens"]
+        entry["saved_pct"] = round(100 * (raw - entry["projected_tokens"]) / raw, 1) if raw else 0.0
+    return report
@@ -0,0 +1,98 @@
+import os
+import threading
+import contextvars
+from typing import Any, Awaitable, Callable, List, Optional
+
+from schemas.finance_app import GeneralizedOutput
+from utils.data_version import data_version
+from utils.idx_classifier import normalize_query
+from utils import metrics
+from utils.single_flight import SingleFlight
+from utils.ttl_cache import TTLCache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_CACHE_SIZE = int(os.getenv("PIPELINE_CACHE_SIZE", "256"))
+PIPELINE_CACHE_TTL = float(os.getenv("PIPELINE_CACHE_TTL", "21600"))
+
+_incomplete: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("pipeline_incomplete", default=None)
+
+def mark_incomplete(reason: str):
+    """
+    Note that the answer being computed is degraded, e.g. a step or tool failed or the budget
+    stopped a run, so get_or_run does not cache it. Does nothing outside get_or_run.
+    """
+    reasons = _incomplete.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+class PipelineCache:
+    """
+    End-to-end cache of answers (GeneralizedOutput) keyed on the normalized query and the
+    Sectors data version. Identical queries arriving while one is being answered wait for
+    that run instead of starting another. When the data version changes every entry is dropped.
+    """
+
+    def __init__(self, maxsize: int = PIPELINE_CACHE_SIZE, ttl: float = PIPELINE_CACHE_TTL):
+        self._cache = TTLCache(maxsize, ttl)
+        self._single_flight = SingleFlight("pipeline")
+        self._version = None
+        self._version_lock = threading.Lock()
+
+    def _key(self, query: str) -> tuple:
+        version = data_version()
+        with self._version_lock:
+            if version != self._version:
+                if self._version is not None:
+                    logger.info(f"Sectors data version changed to {version}, dropping {len(self._cache)} cached answers")
+                self._cache.clear()
+                self._version = version
+        return normalize_query(query), version
+
+    def get(self, query: str):
+        return self._cache.get(self._key(query))
+
+    def set(self, query: str, output: GeneralizedOutput):
+        self._cache.set(self._key(query), output)
+
+    async def get_or_run(self, query: str, func: Callable[[], Awaitable[Any]]):
+        """
+        Return the cached answer for query, or run func() once for all concurrent callers.
+        Only complete GeneralizedOutput results are cached; anything else (e.g. a planner
+        refusal, or an answer for which mark_incomplete was called) is shared with the waiting
+        callers but not kept.
+        """
+        key = self._key(query)
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.info(f"Pipeline cache hit for {key[0]!r}")
+            metrics.cache_requests_total.inc(cache="pipeline", result="hit")
+            return cached
+        metrics.cache_requests_total.inc(cache="pipeline", result="miss")
+
+        async def run():
+            # Tasks started by func() share the list, so their marks are seen here
+            token = _incomplete.set([])
+            try:
+                output = await func()
+                reasons = _incomplete.get()
+            finally:
+                _incomplete.reset(token)
+            if isinstance(output, GeneralizedOutput):
+                if reasons:
+                    logger.info(f"Not caching the answer to {key[0]!r}, it is incomplete: {'; '.join(reasons)}")
+                else:
+                    self._cache.set(key, output)
+            return output
+
+        return await self._single_flight.do(key, run)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), **self._single_flight.stats(), "data_version": self._version}
+
+pipeline_cache = PipelineCache()
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from schemas.finance_app import PlanStep
+from utils.streaming import StreamUpdate
+from utils.ticker_index import ticker_index
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_PARALLEL_CALLS = int(os.getenv("PLAN_MAX_PARALLEL_CALLS", "4"))
+MAX_FAN_OUT = int(os.getenv("PLAN_MAX_FAN_OUT", "10"))
+MAX_TOP_COMPANIES = 100
+FIRST_RANKING_YEAR = 2000
+
+TICKER_PATTERN = re.compile(r"\b([A-Z]{4})(?:\.JK)?\b")
+
+class PlanValidationError(ValueError):
+    """Raised when a plan is not a valid dependency graph."""
+
+@dataclass
+class StepResult:
+    step_id: str
+    tool: str
+    arguments: List[dict] = field(default_factory=list)  # one entry per invocation
+    outputs: List[Any] = field(default_factory=list)  # aligned with arguments, None where the invocation failed
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+def validate_arguments(step: PlanStep):
+    """Check the typed arguments of a step beyond what the schema enforces. Tickers are resolved in place."""
+    call = step.call
+    ticker = getattr(call, "ticker", None)
+    if ticker is not None and not step.for_each_ticker_from:
+        symbol = ticker_index.resolve(ticker)
+        if symbol is None:
+            raise PlanValidationError(f"Step {step.id} has an unknown ticker {ticker!r}")
+        call.ticker = symbol
+    if getattr(call, "date_period", None) is not None and not call.date_period.strip():
+        raise PlanValidationError(f"Step {step.id} has an empty date period")
+    if getattr(call, "n", None) is not None and not 1 <= call.n <= MAX_TOP_COMPANIES:
+        raise PlanValidationError(f"Step {step.id} asks for {call.n} companies, expected 1..{MAX_TOP_COMPANIES}")
+    if getattr(call, "year", None) is not None and not FIRST_RANKING_YEAR <= call.year <= date.today().year:
+        raise PlanValidationError(f"Step {step.id} has an out of range year {call.year}")
+
+def validate_plan(steps: List[PlanStep], tools=None) -> List[PlanStep]:
+    """
+    Check that step ids are unique, dependencies exist, there is no cycle and the arguments
+    are usable. When `tools` is given, every step must use one of them.
+    A fan-out source counts as a dependency even when the planner forgot to list it.
+    Returns the steps in topological order.
+    """
+    by_id = {}
+    for step in steps:
+        if step.id in by_id:
+            raise PlanValidationError(f"Duplicate step id {step.id}")
+        if tools is not None and step.call.tool not in tools:
+            raise PlanValidationError(f"Step {step.id} uses unknown tool {step.call.tool}")
+        validate_arguments(step)
+        by_id[step.id] = step
+
+    dependencies = {}
+    for step in steps:
+        deps = set(step.depends_on)
+        if step.for_each_ticker_from:
+            deps.add(step.for_each_ticker_from)
+        unknown = deps - by_id.keys()
+        if unknown:
+            raise PlanValidationError(f"Step {step.id} depends on unknown step(s) {sorted(unknown)}")
+        dependencies[step.id] = deps
+
+    # Kahn's algorithm, keeping the planner's order among ready steps
+    order = []
+    remaining = {step_id: set(deps) for step_id, deps in dependencies.items()}
+    while remaining:
+        ready = [step.id for step in steps if step.id in remaining and not remaining[step.id]]
+        if not ready:
+            raise PlanValidationError(f"Plan has a dependency cycle between {sorted(remaining)}")
+        for step_id in ready:
+            order.append(by_id[step_id])
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+def _resolve_tickers(candidates) -> List[str]:
+    tickers = []
+    for candidate in candidates:
+        ticker = ticker_index.resolve(candidate, strict=not TICKER_PATTERN.fullmatch(candidate.strip()))
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+def extract_tickers(output) -> List[str]:
+    """
+    Return the company tickers found in a step output: the categories of its bar charts,
+    which may be tickers or company names, or else the companies mentioned in its text.
+    """
+    if not isinstance(output, BaseModel):
+        return ticker_index.find_mentions(str(output)) or _resolve_tickers(TICKER_PATTERN.findall(str(output)))
+    categories = [
+        value
+        for trace in getattr(output, "plot_data", None) or []
+        if trace.chart_type == "bar_horizontal_chart"
+        for value in trace.y + trace.x
+        if isinstance(value, str)
+    ]
+    summary = getattr(output, "summary", "")
+    return _resolve_tickers(categories) or ticker_index.find_mentions(summary) or _resolve_tickers(TICKER_PATTERN.findall(summary))
+
+async def execute_plan(steps: List[PlanStep], dispatch: Dict[str, Callable[..., Awaitable[Any]]],
+                       max_parallel: int = MAX_PARALLEL_CALLS,
+                       emit: Optional[Callable[[StreamUpdate], None]] = None) -> Dict[str, StepResult]:
+    """
+    Run a plan graph: each step starts as soon as its dependencies are done, and at most
+    max_parallel tool invocations run at the same time. A step with for_each_ticker_from runs
+    once per ticker found in that step's output. When emit is given, it receives a tool_called
+    and a tool_output StreamUpdate for each invocation as it starts and ends.
+
+    A failed invocation does not stop the plan. Its error is recorded, and a step that fans out
+    over the tickers of a step without successful output is skipped.
+    """
+    order = validate_plan(steps, dispatch)
+    semaphore = asyncio.Semaphore(max_parallel)
+    results: Dict[str, StepResult] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    emit = emit or (lambda update: None)
+
+    async def invoke(tool: str, arguments: dict):
+        async with semaphore:
+            emit(StreamUpdate("tool_called", name=tool, text=json.dumps(arguments)))
+            try:
+                return await dispatch[tool](**arguments)
+            finally:
+                emit(StreamUpdate("tool_output", name=tool))
+
+    async def run_step(step: PlanStep):
+        deps = set(step.depends_on) | ({step.for_each_ticker_from} if step.for_each_ticker_from else set())
+        await asyncio.gather(*(tasks[dep] for dep in deps))
+
+        tool = step.call.tool
+        arguments = step.call.model_dump(exclude={"tool"})
+        result = StepResult(step_id=step.id, tool=tool)
+        results[step.id] = result
+
+        if step.for_each_ticker_from:
+            source = results[step.for_each_ticker_from]
+            tickers = [t for output in source.outputs if output is not None for t in extract_tickers(output)]
+            if not tickers:
+                result.error = f"skipped: no tickers from step {step.for_each_ticker_from}"
+                return
+            result.arguments = [{**arguments, "ticker": ticker} for ticker in tickers[:MAX_FAN_OUT]]
+        else:
+            result.arguments = [arguments]
+
+        started = time.perf_counter()
+        outputs = await asyncio.gather(*(invoke(tool, args) for args in result.arguments), return_exceptions=True)
+        result.elapsed = time.perf_counter() - started
+        errors = [f"{args}: {output}" for args, output in zip(result.arguments, outputs) if isinstance(output, BaseException)]
+        result.outputs = [None if isinstance(output, BaseException) else output for output in outputs]
+        if errors:
+            result.error = "; ".join(errors)
+            logger.warning(f"Plan step {step.id} ({tool}) failed for {len(errors)} invocation(s): {result.error}")
+        logger.info(f"Plan step {step.id} ({tool}) finished {len(outputs)} invocation(s) in {result.elapsed:.2f}s")
+
+    # Tasks are created in topological order, so every dependency task exists when awaited
+    for step in order:
+        tasks[step.id] = asyncio.create_task(run_step(step))
+    await asyncio.gather(*tasks.values())
+    return {step.id: results[step.id] for step in order}
+
+def format_plan_results(results: Dict[str, StepResult], include_plot_data: bool = True) -> str:
+    """
+    Render step results as text for the agent that writes the final answer.
+    Without plot data only the summaries of structured outputs are kept.
+    """
+    sections = []
+    for result in results.values():
+        lines = [f"Step {result.step_id}: {result.tool}"]
+        for arguments, output in zip(result.arguments, result.outputs):
+            if output is None:
+                continue
+            if isinstance(output, BaseModel):
+                rendered = output.model_dump_json(exclude=None if include_plot_data else {"plot_data"})
+            else:
+                rendered = str(output)
+            lines.append(f"- {arguments}: {rendered}")
+        if result.error:
+            lines.append(f"- error: {result.error}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+def collect_plot_data(results: Dict[str, StepResult]) -> list:
+    """Concatenate the chart traces of all step outputs, in step order."""
+    plot_data = []
+    for result in results.values():
+        for output in result.outputs:
+            plot_data += getattr(output, "plot_data", None) or []
+    return plot_data
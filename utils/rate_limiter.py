@@ -0,0 +1,301 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from utils import metrics
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; 429 and 503 also mean the API wants us to slow down
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUSES = {429, 503}
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    rate: float = 5.0              # sustained requests per second
+    burst: int = 10                # requests allowed back to back
+    initial_concurrency: int = 4
+    min_concurrency: int = 1
+    max_concurrency: int = 16
+    max_attempts: int = 4          # first try included
+    base_delay: float = 0.5        # seconds, doubled each retry before jitter
+    max_delay: float = 8.0
+    max_retry_after: float = 30.0  # Retry-After values above this are capped
+
+DEFAULT_POLICIES = {
+    "daily": EndpointPolicy(),
+    "company_report": EndpointPolicy(),
+    "companies_top": EndpointPolicy(rate=2.0, burst=4),
+    "other": EndpointPolicy(),
+}
+
+class TokenBucket:
+    """
+    Token bucket shared by every event loop of the process.
+    A caller reserves a token right away and sleeps until it would have been available,
+    so callers are served in order without polling.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            self._refill_locked()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Hold back every caller for the given time, e.g. after a Retry-After."""
+        with self._lock:
+            self._refill_locked()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit adjusted with AIMD: it grows by about one slot per window of
+    successful requests and is cut multiplicatively when the API signals overload.
+    Waiters may sit on different event loops; they are woken thread-safely in FIFO order.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, decrease_factor: float = 0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True  # a slot was handed over while we were being cancelled
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_locked()
+
+    def _wake_locked(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(_grant, future)
+
+    def on_success(self):
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._wake_locked()
+
+    def on_overload(self):
+        with self._lock:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+def _grant(future: asyncio.Future):
+    # A cancelled waiter releases the slot itself, see AdaptiveConcurrencyLimiter.acquire
+    if not future.done():
+        future.set_result(None)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class EndpointController:
+    """Rate limit, concurrency limit and retry policy for one endpoint family."""
+
+    def __init__(self, family: str, policy: EndpointPolicy):
+        self.family = family
+        self.policy = policy
+        self.bucket = TokenBucket(policy.rate, policy.burst)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            policy.initial_concurrency, policy.min_concurrency, policy.max_concurrency
+        )
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "transport_errors": 0,
+            "gave_up": 0,
+            "rate_wait_seconds": 0.0,
+        }
+        self._observe_limiter()
+
+    def _count(self, name: str, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _observe_limiter(self):
+        metrics.sectors_concurrency_limit.set(round(self.limiter.limit, 2), family=self.family)
+        metrics.sectors_in_flight.set(self.limiter.in_flight, family=self.family)
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # Full jitter keeps retries of parallel sub-agents from arriving together
+        delay = random.uniform(0, min(self.policy.max_delay, self.policy.base_delay * 2 ** (attempt - 1)))
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                retry_after = min(retry_after, self.policy.max_retry_after)
+                self.bucket.pause(retry_after)
+                delay = max(delay, retry_after)
+        return delay
+
+    async def send(self, request: Callable[[], Awaitable[httpx.Response]], url: str = "") -> httpx.Response:
+        """
+        Send a request under the family's limits, retrying 429/5xx responses and transport errors.
+        Returns the last response once it is final or attempts run out; re-raises the last transport error.
+        """
+        for attempt in range(1, self.policy.max_attempts + 1):
+            wait = await self.bucket.acquire()
+            self._count("rate_wait_seconds", wait)
+            metrics.sectors_rate_wait_seconds.observe(wait, family=self.family)
+            await self.limiter.acquire()
+            self._count("requests")
+            self._observe_limiter()
+            response, error = None, None
+            try:
+                response = await request()
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                self.limiter.release()
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                self.limiter.on_success()
+                self._observe_limiter()
+                return response
+
+            if error is not None:
+                reason = "transport_error"
+                self._count("transport_errors")
+                if isinstance(error, httpx.TimeoutException):
+                    self.limiter.on_overload()
+            elif response.status_code == 429:
+                reason = "throttled"
+                self._count("throttled")
+                metrics.sectors_throttled_total.inc(family=self.family)
+                self.limiter.on_overload()
+            else:
+                reason = "server_error"
+                self._count("server_errors")
+                if response.status_code in OVERLOAD_STATUSES:
+                    self.limiter.on_overload()
+            self._observe_limiter()
+
+            if attempt == self.policy.max_attempts:
+                self._count("gave_up")
+                metrics.sectors_gave_up_total.inc(family=self.family)
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            self._count("retries")
+            metrics.sectors_retries_total.inc(family=self.family, reason=reason)
+            failure = error if error is not None else f"HTTP {response.status_code}"
+            logger.warning(f"Retrying {url} in {delay:.2f}s after {failure} (attempt {attempt}/{self.policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["concurrency_limit"] = round(self.limiter.limit, 2)
+        stats["in_flight"] = self.limiter.in_flight
+        return stats
+
+def _policy_from_env(family: str, policy: EndpointPolicy) -> EndpointPolicy:
+    prefix = f"SECTORS_{family.upper()}"
+    overrides = {}
+    if os.getenv(f"{prefix}_RATE"):
+        overrides["rate"] = float(os.getenv(f"{prefix}_RATE"))
+    if os.getenv(f"{prefix}_MAX_CONCURRENCY"):
+        overrides["max_concurrency"] = int(os.getenv(f"{prefix}_MAX_CONCURRENCY"))
+    if os.getenv(f"{prefix}_MAX_ATTEMPTS"):
+        overrides["max_attempts"] = int(os.getenv(f"{prefix}_MAX_ATTEMPTS"))
+    return replace(policy, **overrides)
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+def get_controller(family: str) -> EndpointController:
+    with _controllers_lock:
+        controller = _controllers.get(family)
+        if controller is None:
+            policy = _policy_from_env(family, DEFAULT_POLICIES.get(family, DEFAULT_POLICIES["other"]))
+            controller = EndpointController(family, policy)
+            _controllers[family] = controller
+        return controller
+
+def configure_endpoint(family: str, **overrides) -> EndpointController:
+    """Replace the policy of an endpoint family, e.g. configure_endpoint("daily", rate=10, burst=20)."""
+    policy = replace(DEFAULT_POLICIES.get(family, DEFAULT_POLICIES["other"]), **overrides)
+    with _controllers_lock:
+        _controllers[family] = EndpointController(family, policy)
+        return _controllers[family]
+
+def get_rate_limit_stats() -> dict:
+    """
+    Return per-family counters, current concurrency limit and requests in flight.
+    The same figures are exported as agentic_sectors_* metrics on the scrape endpoint.
+    """
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {family: controller.stats() for family, controller in controllers.items()}
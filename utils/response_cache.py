@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils import async_runtime
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("SECTORS_CACHE_PATH", os.path.join(".cache", "sectors_responses.sqlite3"))
+# Seconds between purges of expired responses; a row is otherwise only replaced when its URL is stored again
+PURGE_INTERVAL = float(os.getenv("SECTORS_CACHE_PURGE_INTERVAL", "3600"))
+
+# Endpoint families of the Sectors API used by the agents
+ENDPOINT_FAMILIES = {
+    "daily": re.compile(r"/daily/[^/]+/?$"),
+    "company_report": re.compile(r"/company/report/[^/]+/?$"),
+    "companies_top": re.compile(r"/companies/top/?$"),
+}
+
+# Time-to-live in seconds per endpoint family, overridable with SECTORS_CACHE_TTL_<FAMILY>
+ENDPOINT_TTLS = {
+    "daily": 3600,
+    "company_report": 24 * 3600,
+    "companies_top": 24 * 3600,
+    "other": 3600,
+}
+
+def endpoint_family(url: str) -> str:
+    """Return the endpoint family of a Sectors URL, or 'other' if it is not one we know."""
+    path = urlsplit(url).path
+    for family, pattern in ENDPOINT_FAMILIES.items():
+        if pattern.search(path):
+            return family
+    return "other"
+
+def ttl_for(url: str) -> int:
+    """Return the cache time-to-live of a Sectors URL in seconds."""
+    family = endpoint_family(url)
+    return int(os.getenv(f"SECTORS_CACHE_TTL_{family.upper()}", ENDPOINT_TTLS[family]))
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that equivalent requests share one cache key:
+    lower-case scheme and host, sorted query parameters, no fragment.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+def connect(path: str = CACHE_PATH) -> sqlite3.Connection:
+    """Open a SQLite connection in WAL mode, which lets several processes share the cache file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class ResponseCache:
+    """
+    Disk-backed cache of Sectors responses keyed by normalized URL.
+    SQLite in WAL mode lets several processes (Streamlit replicas, CLI runs) read and write the same file.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str):
+        """Return the cached payload of a URL, or None if it is missing or expired."""
+        try:
+            row = self._connection().execute(
+                "SELECT payload FROM responses WHERE key = ? AND expires_at > ?",
+                (normalize_url(url), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed for {url}: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, url: str, data, ttl: Optional[int] = None):
+        """Store the payload of a URL for ttl seconds (the endpoint family TTL by default)."""
+        now = time.time()
+        ttl = ttl_for(url) if ttl is None else ttl
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO responses (key, payload, fetched_at, expires_at) VALUES (?, ?, ?, ?)",
+                (normalize_url(url), json.dumps(data), now, now + ttl)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed for {url}: {e}")
+
+    def delete(self, url: str):
+        try:
+            self._connection().execute("DELETE FROM responses WHERE key = ?", (normalize_url(url),))
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache delete failed for {url}: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        try:
+            cursor = self._connection().execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache purge failed: {e}")
+            return 0
+        return cursor.rowcount
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache clear failed: {e}")
+
+response_cache = ResponseCache()
+
+async def purge_periodically(cache: ResponseCache = response_cache, interval: float = PURGE_INTERVAL):
+    """Purge expired responses every interval seconds, off the event loop."""
+    while True:
+        removed = await asyncio.to_thread(cache.purge_expired)
+        if removed:
+            logger.info(f"Purged {removed} expired Sectors responses")
+        await asyncio.sleep(interval)
+
+_purge_started = False
+_purge_lock = threading.Lock()
+
+def start_cache_purge():
+    """
+    Start the periodic purge once per process on the background async runtime.
+    Set SECTORS_CACHE_PURGE_INTERVAL=0 to turn it off.
+    """
+    global _purge_started
+    if PURGE_INTERVAL <= 0:
+        return None
+    with _purge_lock:
+        if _purge_started:
+            return None
+        _purge_started = True
+    return async_runtime.submit(purge_periodically())
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving while it is
+    in flight await the same result instead of starting their own. The shared result is a
+    concurrent.futures.Future, so callers on different event loops or threads can join it.
+    Errors for which private(error) is true belong to the leader's caller, e.g. its request
+    ran out of budget: followers do not receive them, one of them runs the work instead.
+    """
+
+    def __init__(self, name: str, private: Optional[Callable[[Exception], bool]] = None):
+        self.name = name
+        self._private = private
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._calls = 0
+        self._executions = 0
+        self._deduplicated = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() for key, or wait for the run already in flight for the same key."""
+        with self._lock:
+            self._calls += 1
+        while True:
+            with self._lock:
+                shared = self._in_flight.get(key)
+                if shared is None:
+                    shared = concurrent.futures.Future()
+                    self._in_flight[key] = shared
+                    self._executions += 1
+                    leader = True
+                else:
+                    self._deduplicated += 1
+                    leader = False
+
+            if leader:
+                return await self._lead(key, shared, func)
+
+            try:
+                # Shield so a cancelled follower does not cancel the shared result
+                return await asyncio.shield(asyncio.wrap_future(shared))
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The leader was cancelled or stopped, not us: take over the work
+                logger.info(f"[{self.name}] leader for {key!r} stopped, retrying")
+
+    async def _lead(self, key, shared: concurrent.futures.Future, func):
+        try:
+            result = await func()
+        except BaseException as e:
+            if isinstance(e, Exception) and not (self._private and self._private(e)):
+                shared.set_exception(e)
+            else:
+                # Cancellation, control flow or an error meant for the leader's caller only (e.g. a
+                # Streamlit rerun or stop raised in its session): followers must not inherit it,
+                # one of them takes over
+                shared.cancel()
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            # Avoid "exception was never retrieved" noise when nobody joined
+            if shared.done() and not shared.cancelled():
+                shared.exception()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> dict:
+        """Return counters: total calls, upstream executions and deduplicated calls."""
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "executions": self._executions,
+                "deduplicated": self._deduplicated,
+                "in_flight": len(self._in_flight),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = self._executions = self._deduplicated = 0
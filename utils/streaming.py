@@ -0,0 +1,86 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Literal, Optional
+
+from agents import RunResultStreaming
+from openai.types.responses import ResponseTextDeltaEvent
+
+@dataclass
+class StreamUpdate:
+    """A progress update of a streamed agent run, simplified for display."""
+    kind: Literal["agent", "tool_called", "tool_output", "text"]
+    name: str = ""
+    text: str = ""
+
+_TRAILING_ESCAPE = re.compile(r"(\\+)(u[0-9a-fA-F]{0,3})?$")
+
+def _trim_incomplete_escape(value: str) -> str:
+    """Drop an escape sequence cut in half at the end of a delta; it completes with the next one."""
+    match = _TRAILING_ESCAPE.search(value)
+    if match and len(match.group(1)) % 2 == 1:
+        return value[:match.end(1) - 1]
+    return value
+
+def partial_json_string_field(buffer: str, field: str) -> Optional[str]:
+    """
+    Return the value of a top-level string field from a JSON document that is still being generated,
+    e.g. the summary of '{"summary": "BBCA closed higher' is 'BBCA closed higher'.
+    Returns None while the field has not started.
+    """
+    match = re.search(rf'"{re.escape(field)}"\s*:\s*"', buffer)
+    if match is None:
+        return None
+
+    raw = []
+    escaped = False
+    for char in buffer[match.end():]:
+        if char == '"' and not escaped:
+            break
+        raw.append(char)
+        escaped = char == "\\" and not escaped
+    value = _trim_incomplete_escape("".join(raw))
+    try:
+        return json.loads(f'"{value}"')
+    except json.JSONDecodeError:
+        return value
+
+async def stream_updates(result: RunResultStreaming, field: str = "summary") -> AsyncIterator[StreamUpdate]:
+    """
+    Turn the events of Runner.run_streamed into display updates: agent switches, tool calls,
+    tool outputs and the text generated so far. For structured outputs the text is the partial
+    value of `field`; plain text outputs are passed through as they grow.
+    """
+    buffer = ""
+    tool_names = {}
+    async for event in result.stream_events():
+        if event.type == "raw_response_event":
+            if isinstance(event.data, ResponseTextDeltaEvent):
+                buffer += event.data.delta
+                if buffer.lstrip().startswith("{"):
+                    text = partial_json_string_field(buffer, field)
+                else:
+                    text = buffer
+                if text:
+                    yield StreamUpdate("text", text=text)
+
+        elif event.type == "agent_updated_stream_event":
+            buffer = ""
+            yield StreamUpdate("agent", name=event.new_agent.name)
+
+        elif event.type == "run_item_stream_event":
+            raw_item = event.item.raw_item
+            if event.name == "tool_called":
+                buffer = ""
+                name = getattr(raw_item, "name", "tool")
+                tool_names[getattr(raw_item, "call_id", None)] = name
+                yield StreamUpdate("tool_called", name=name, text=getattr(raw_item, "arguments", ""))
+            elif event.name == "tool_output":
+                call_id = raw_item.get("call_id") if isinstance(raw_item, dict) else getattr(raw_item, "call_id", None)
+                yield StreamUpdate("tool_output", name=tool_names.get(call_id, "tool"))
+
+async def forward_stream_updates(result: RunResultStreaming, emit: Callable[[StreamUpdate], None], field: str = "summary"):
+    """Pass the display updates of a streamed run to emit, then return the run's final output."""
+    async for update in stream_updates(result, field):
+        emit(update)
+    return result.final_output
@@ -0,0 +1,255 @@
+import os
+import re
+import csv
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.getenv(
+    "TICKER_INDEX_PATH", os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "idx_companies.csv"))
+)
+FUZZY_THRESHOLD = float(os.getenv("TICKER_FUZZY_THRESHOLD", "0.5"))
+# resolve() acts on its match without asking, so it needs a closer one than a suggestion does
+RESOLVE_THRESHOLD = float(os.getenv("TICKER_RESOLVE_THRESHOLD", "0.75"))
+NGRAM_SIZE = 3
+
+TICKER_FORMAT = re.compile(r"^[A-Z]{4}$")
+# Words dropped from company names before matching
+LEGAL_WORDS = {"pt", "tbk", "persero"}
+# Tickers that are also everyday words, only recognized in free text when written in capitals
+WORD_TICKERS = {
+    "ACES", "AUTO", "BELI", "BIRD", "BUKA", "CUAN", "ELSA", "ESSA", "GOTO", "HEAL",
+    "MAPA", "MEGA", "MIKA", "PANI", "RAJA", "SILO", "TINS", "TOBA",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# A word of free text, with the .JK suffix kept but not a full stop ending the sentence
+_TOKEN = re.compile(r"[A-Za-z0-9]+(?:\.JK)?", re.IGNORECASE)
+
+def normalize_ticker(text: str) -> str:
+    return text.strip().upper().removesuffix(".JK")
+
+def normalize_name(text: str) -> str:
+    """Lower-case a company name and drop punctuation and legal words, e.g. 'PT Bank Mandiri (Persero) Tbk' -> 'bank mandiri'."""
+    words = _NON_ALNUM.sub(" ", text.lower()).split()
+    return " ".join(word for word in words if word not in LEGAL_WORDS)
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    padded = f"{' ' * (n - 1)}{text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+@dataclass(frozen=True)
+class Company:
+    symbol: str
+    name: str
+    aliases: Tuple[str, ...] = ()
+
+@dataclass
+class Match:
+    symbol: str
+    matched: str
+    score: float
+
+class TickerIndex:
+    """
+    In-memory index of IDX companies: exact lookup by ticker, name or alias, prefix completion
+    over a character trie, and fuzzy lookup by character trigram similarity for misspellings.
+    """
+
+    def __init__(self, companies: Iterable[Company] = ()):
+        self.companies: Dict[str, Company] = {}
+        self._keys: Dict[str, str] = {}  # normalized name or alias -> symbol
+        self._trie: dict = {}
+        self._grams: Dict[str, Set[str]] = {}  # trigram -> keys containing it
+        self._gram_counts: Dict[str, int] = {}
+        for company in companies:
+            self.add(company)
+
+    @classmethod
+    def from_csv(cls, path: str = INDEX_PATH) -> "TickerIndex":
+        """Load companies from a CSV with symbol, company_name and semicolon separated aliases."""
+        companies = []
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    aliases = tuple(alias.strip() for alias in (row.get("aliases") or "").split(";") if alias.strip())
+                    companies.append(Company(normalize_ticker(row["symbol"]), row["company_name"].strip(), aliases))
+        except FileNotFoundError:
+            logger.warning(f"Ticker index file {path} not found, starting with an empty index")
+        return cls(companies)
+
+    def add(self, company: Company):
+        self.companies[company.symbol] = company
+        for text in (company.name, *company.aliases):
+            key = normalize_name(text)
+            if key and key not in self._keys:
+                self._add_key(key, company.symbol)
+        self._add_key(company.symbol.lower(), company.symbol)
+
+    def _add_key(self, key: str, symbol: str):
+        self._keys[key] = symbol
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault("$", set()).add(symbol)  # symbols reachable below this prefix
+        grams = ngrams(key)
+        self._gram_counts[key] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(key)
+
+    def __contains__(self, ticker: str) -> bool:
+        return normalize_ticker(ticker) in self.companies
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def get(self, ticker: str) -> Optional[Company]:
+        return self.companies.get(normalize_ticker(ticker))
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Exact match on a ticker (with or without .JK), company name or alias."""
+        symbol = normalize_ticker(text)
+        if symbol in self.companies:
+            return symbol
+        return self._keys.get(normalize_name(text))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Symbols whose ticker, name or alias starts with prefix, in ticker order."""
+        node = self._trie
+        for char in normalize_name(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        return sorted(node.get("$", ()))[:limit]
+
+    def fuzzy(self, text: str, limit: int = 5, threshold: float = FUZZY_THRESHOLD) -> List[Match]:
+        """Closest names and aliases by Dice similarity of character trigrams, best first, one match per symbol."""
+        query = normalize_name(text)
+        if not query:
+            return []
+        query_grams = ngrams(query)
+        shared = {}
+        for gram in query_grams:
+            for key in self._grams.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        best = {}
+        for key, count in shared.items():
+            score = 2 * count / (len(query_grams) + self._gram_counts[key])
+            symbol = self._keys[key]
+            if score >= threshold and score > best.get(symbol, Match(symbol, key, 0.0)).score:
+                best[symbol] = Match(symbol, key, score)
+        return sorted(best.values(), key=lambda match: -match.score)[:limit]
+
+    def resolve(self, text: str, strict: bool = False) -> Optional[str]:
+        """
+        Resolve a ticker or company name to a ticker: exact match first, then for names the
+        single prefix completion, then the best fuzzy match if it is close (RESOLVE_THRESHOLD).
+        A well-formed ticker that is not in the index is returned as it is unless strict, since
+        the index may not list every company; it is never matched to a similar looking one. A
+        name with no close match gives None rather than a company that merely shares words.
+        """
+        if not text or not text.strip():
+            return None
+        symbol = self.lookup(text)
+        if symbol:
+            return symbol
+
+        ticker = normalize_ticker(text)
+        if TICKER_FORMAT.fullmatch(ticker):
+            return None if strict else ticker
+
+        completions = self.complete(text, limit=2) if len(normalize_name(text)) >= 4 else []
+        if len(completions) == 1:
+            return completions[0]
+
+        matches = self.fuzzy(text, limit=2)
+        # Only take a close fuzzy match that clearly beats the runner-up
+        if matches and matches[0].score >= RESOLVE_THRESHOLD and (
+            len(matches) == 1 or matches[0].score - matches[1].score >= 0.1
+        ):
+            logger.info(f"Resolved {text!r} to {matches[0].symbol} (fuzzy, score {matches[0].score:.2f})")
+            return matches[0].symbol
+        return None
+
+    def find_mentions(self, text: str) -> List[str]:
+        """Symbols of the companies mentioned in free text, by ticker, name or alias, in order of appearance."""
+        found = []
+        for match in _TOKEN.finditer(text):
+            token = match.group()
+            symbol = normalize_ticker(token)
+            if symbol in self.companies and (symbol not in WORD_TICKERS or token.upper() == token):
+                found.append((match.start(), symbol))
+
+        normalized = f" {normalize_name(text)} "
+        lowered = text.lower()
+        for key, symbol in self._keys.items():
+            if key != symbol.lower() and f" {key} " in normalized:
+                position = lowered.find(key.split()[0])
+                found.append((position if position >= 0 else len(text), symbol))
+
+        symbols = []
+        for _, symbol in sorted(found):
+            if symbol not in symbols:
+                symbols.append(symbol)
+        return symbols
+
+    def to_csv(self, path: str = INDEX_PATH):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["symbol", "company_name", "aliases"])
+            for symbol in sorted(self.companies):
+                company = self.companies[symbol]
+                writer.writerow([symbol, company.name, ";".join(company.aliases)])
+
+async def refresh_from_sectors(index: "TickerIndex") -> int:
+    """
+    Add every listed company from the Sectors API (subsectors, then the companies of each)
+    to the index, keeping the aliases already there. Returns the number of new companies.
+    """
+    import asyncio
+    from utils.api_client import aretrieve_from_endpoint
+    from utils.config import SECTORS_BASE_URL
+
+    subsectors = await aretrieve_from_endpoint(f"{SECTORS_BASE_URL}/subsectors/")
+    if not isinstance(subsectors, list):
+        raise RuntimeError(f"Unexpected subsectors payload: {subsectors}")
+    slugs = [item if isinstance(item, str) else item.get("subsector") or item.get("sub_sector") for item in subsectors]
+
+    payloads = await asyncio.gather(*(
+        aretrieve_from_endpoint(f"{SECTORS_BASE_URL}/companies/?sub_sector={slug}") for slug in slugs if slug
+    ))
+    added = 0
+    for payload in payloads:
+        for item in payload if isinstance(payload, list) else []:
+            symbol = normalize_ticker(item.get("symbol", ""))
+            if not TICKER_FORMAT.fullmatch(symbol):
+                continue
+            existing = index.companies.get(symbol)
+            if existing is None:
+                added += 1
+            index.add(Company(symbol, item.get("company_name") or symbol, existing.aliases if existing else ()))
+    return added
+
+ticker_index = TickerIndex.from_csv()
+
+if __name__ == "__main__":
+    import asyncio
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Look up IDX tickers, or refresh the company list from the Sectors API.")
+    parser.add_argument("query", nargs="*", help="Tickers or company names to resolve")
+    parser.add_argument("--refresh", action="store_true", help=f"Fetch all listed companies and rewrite {INDEX_PATH}")
+    args = parser.parse_args()
+
+    if args.refresh:
+        from utils.config import setup_sectors_api_key
+        setup_sectors_api_key()
+        added = asyncio.run(refresh_from_sectors(ticker_index))
+        ticker_index.to_csv()
+        print(f"Added {added} companies, {len(ticker_index)} in total")
+    for query in args.query:
+        print(f"{query}: {ticker_index.resolve(query)} {[(m.symbol, round(m.score, 2)) for m in ticker_index.fuzzy(query)]}")
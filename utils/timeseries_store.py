@@ -0,0 +1,124 @@
+import os
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from utils.config import SECTORS_SOURCE
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.getenv("SECTORS_TIMESERIES_PATH", os.path.join(".cache", "daily"))
+
+DAILY_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+    ("market_cap", pa.float64()),
+])
+VALUE_COLUMNS = [name for name in DAILY_SCHEMA.names if name != "date"]
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+class TimeSeriesStore:
+    """
+    Columnar store of daily bars, one Arrow IPC file per ticker (<root>/ticker=<TICKER>/daily.arrow).
+    The default root is per Sectors source (<STORE_PATH>/source=<host>).
+
+    Files are sorted by date and read through a memory map. A range query is a binary
+    search on the date column followed by a zero-copy slice, so nothing is parsed or copied.
+    Writers replace the whole file atomically, and readers holding the old map are unaffected.
+    """
+
+    def __init__(self, root: str = os.path.join(STORE_PATH, f"source={SECTORS_SOURCE}")):
+        self.root = root
+        self._lock = threading.Lock()
+        self._tables = {}  # path -> (mtime_ns, table)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"ticker={ticker.upper()}", "daily.arrow")
+
+    def read(self, ticker: str) -> pa.Table:
+        """Return the full memory-mapped series of a ticker (an empty table if none is stored)."""
+        path = self._path(ticker)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return DAILY_SCHEMA.empty_table()
+
+        with self._lock:
+            cached = self._tables.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        with self._lock:
+            self._tables[path] = (mtime, table)
+        return table
+
+    def range(self, ticker: str, start: date, end: date) -> pa.Table:
+        """Return the rows of a ticker with start <= date <= end as a zero-copy slice."""
+        table = self.read(ticker)
+        if table.num_rows == 0:
+            return table
+        days = table.column("date").combine_chunks().view(pa.int32()).to_numpy()
+        lo = np.searchsorted(days, _epoch_day(start), side="left")
+        hi = np.searchsorted(days, _epoch_day(end), side="right")
+        return table.slice(lo, hi - lo)
+
+    def load(self, tickers: Iterable[str], start: date, end: date) -> pa.Table:
+        """Return the rows of several tickers in one table with an added ticker column."""
+        tables = []
+        for ticker in tickers:
+            table = self.range(ticker, start, end)
+            ticker_column = pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(table.num_rows, dtype=np.int32)), pa.array([ticker.upper()])
+            )
+            tables.append(table.add_column(0, "ticker", ticker_column))
+        if not tables:
+            return DAILY_SCHEMA.empty_table()
+        # Chunks are concatenated by reference, the value buffers stay memory-mapped
+        return pa.concat_tables(tables)
+
+    def frame(self, tickers: Iterable[str], start: date, end: date):
+        """Same as load() but as a pandas DataFrame, for plotting."""
+        return self.load(tickers, start, end).to_pandas()
+
+    def upsert(self, ticker: str, rows: List[dict]):
+        """Merge API rows (dicts with a 'date' key) into the stored series of a ticker."""
+        if not rows:
+            return
+        merged: Dict[date, dict] = {row["date"]: row for row in self.read(ticker).to_pylist()}
+        for row in rows:
+            if not row.get("date"):
+                continue
+            day = date.fromisoformat(str(row["date"])[:10])
+            merged[day] = {"date": day, **{name: _to_float(row.get(name)) for name in VALUE_COLUMNS}}
+
+        table = pa.Table.from_pylist([merged[day] for day in sorted(merged)], schema=DAILY_SCHEMA)
+        path = self._path(ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, DAILY_SCHEMA) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        logger.info(f"Stored {table.num_rows} daily rows for {ticker.upper()}")
+
+def _epoch_day(day: date) -> int:
+    return day.toordinal() - date(1970, 1, 1).toordinal()
+
+def to_rows(table: pa.Table) -> List[dict]:
+    """Convert a daily table back into API-style rows with ISO dates."""
+    rows = table.to_pylist()
+    for row in rows:
+        row["date"] = row["date"].isoformat()
+    return rows
+
+timeseries_store = TimeSeriesStore()
@@ -0,0 +1,166 @@
+from typing import List, Optional
+
+import numpy as np
+
+from utils.downsampling import SERIES_POINT_BUDGET, downsample_rows
+from utils.payload_projection import is_error_payload, project
+
+TRADING_DAYS_PER_YEAR = 252
+SMA_WINDOWS = (5, 20, 50)
+VOLUME_SPIKE_Z = 2.0
+RETURN_ANOMALY_Z = 2.5
+MAX_LISTED_EVENTS = 5
+
+def columns_from_rows(rows: List[dict]) -> dict:
+    """Turn API-style daily rows into NumPy columns sorted by date."""
+    rows = sorted((row for row in rows if row.get("date")), key=lambda row: row["date"])
+    columns = {"date": np.array([str(row["date"])[:10] for row in rows], dtype="datetime64[D]")}
+    for name in ("close", "volume", "market_cap"):
+        columns[name] = np.array(
+            [np.nan if row.get(name) is None else float(row[name]) for row in rows], dtype=np.float64
+        )
+    return columns
+
+def _pct(value: float, signed: bool = True) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    return f"{value * 100:+.2f}%" if signed else f"{value * 100:.2f}%"
+
+def _num(value: float) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    return f"{value:,.0f}" if abs(value) >= 100 else f"{value:,.4g}"
+
+def _day(dates: np.ndarray, index) -> str:
+    return str(dates[index])
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average via cumulative sums; the first window-1 points are NaN."""
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        cumsum = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return out
+
+def max_drawdown(values: np.ndarray) -> tuple:
+    """Return (drawdown as a negative fraction, peak index, trough index)."""
+    running_peak = np.maximum.accumulate(values)
+    drawdowns = values / running_peak - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return float(drawdowns[trough]), peak, trough
+
+def zscores(values: np.ndarray) -> np.ndarray:
+    std = np.nanstd(values)
+    if not std or not np.isfinite(std):
+        return np.zeros_like(values)
+    return (values - np.nanmean(values)) / std
+
+def _price_lines(dates: np.ndarray, close: np.ndarray) -> List[str]:
+    valid = np.isfinite(close)
+    dates, close = dates[valid], close[valid]
+    if len(close) == 0:
+        return ["close: no data"]
+
+    lo, hi = int(np.argmin(close)), int(np.argmax(close))
+    lines = [
+        f"close: first={_num(close[0])}, last={_num(close[-1])}, change={_pct(close[-1] / close[0] - 1)}, "
+        f"min={_num(close[lo])} on {_day(dates, lo)}, max={_num(close[hi])} on {_day(dates, hi)}, mean={_num(close.mean())}"
+    ]
+    if len(close) < 2:
+        return lines
+
+    returns = np.diff(close) / close[:-1]
+    volatility = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    lines.append(
+        f"returns: mean_daily={_pct(returns.mean())}, volatility_daily={_pct(volatility, signed=False)}, "
+        f"volatility_annualized={_pct(volatility * np.sqrt(TRADING_DAYS_PER_YEAR), signed=False)}, "
+        f"up_days={int((returns > 0).sum())}, down_days={int((returns < 0).sum())}"
+    )
+
+    averages = [
+        f"sma_{window}={_num(sma(close, window)[-1])} (last vs sma {_pct(close[-1] / sma(close, window)[-1] - 1)})"
+        for window in SMA_WINDOWS if len(close) >= window
+    ]
+    if averages:
+        lines.append("moving_averages: " + ", ".join(averages))
+
+    drawdown, peak, trough = max_drawdown(close)
+    lines.append(f"max_drawdown: {_pct(drawdown)} from {_day(dates, peak)} to {_day(dates, trough)}")
+
+    # Least-squares slope of the price relative to its mean, per trading day
+    x = np.arange(len(close), dtype=np.float64)
+    slope, intercept = np.polyfit(x, close, 1)
+    fitted = slope * x + intercept
+    total = ((close - close.mean()) ** 2).sum()
+    r2 = 1 - ((close - fitted) ** 2).sum() / total if total else 0.0
+    lines.append(f"trend: slope={_pct(slope / close.mean())} per trading day, r2={r2:.2f}")
+
+    z = zscores(returns)
+    anomalies = np.flatnonzero(np.abs(z) > RETURN_ANOMALY_Z)
+    if len(anomalies):
+        listed = sorted(anomalies, key=lambda i: -abs(z[i]))[:MAX_LISTED_EVENTS]
+        events = ", ".join(f"{_day(dates, i + 1)} return={_pct(returns[i])} z={z[i]:+.1f}" for i in sorted(listed))
+        lines.append(f"return_anomalies (|z| > {RETURN_ANOMALY_Z}): {events}")
+    else:
+        lines.append(f"return_anomalies (|z| > {RETURN_ANOMALY_Z}): none")
+    return lines
+
+def _volume_lines(dates: np.ndarray, volume: np.ndarray) -> List[str]:
+    valid = np.isfinite(volume)
+    dates, volume = dates[valid], volume[valid]
+    if len(volume) == 0:
+        return []
+
+    median = np.median(volume)
+    line = f"volume: mean={_num(volume.mean())}, median={_num(median)}, last={_num(volume[-1])}"
+    z = zscores(volume)
+    spikes = np.flatnonzero(z > VOLUME_SPIKE_Z)
+    if len(spikes):
+        listed = sorted(spikes, key=lambda i: -z[i])[:MAX_LISTED_EVENTS]
+        events = ", ".join(f"{_day(dates, i)} ({volume[i] / median:.1f}x median, z={z[i]:.1f})" for i in sorted(listed))
+        line += f", spikes (z > {VOLUME_SPIKE_Z}): {events}"
+    else:
+        line += ", spikes: none"
+    return [line]
+
+def _market_cap_lines(market_cap: np.ndarray) -> List[str]:
+    market_cap = market_cap[np.isfinite(market_cap)]
+    if len(market_cap) == 0:
+        return []
+    return [
+        f"market_cap: first={_num(market_cap[0])}, last={_num(market_cap[-1])}, "
+        f"change={_pct(market_cap[-1] / market_cap[0] - 1)}, max={_num(market_cap.max())}"
+    ]
+
+def trend_statistics(columns: dict) -> Optional[str]:
+    """
+    Compute trend statistics for a daily series: returns, moving averages, volatility,
+    drawdown, trend slope, volume spikes and z-score anomalies. Returns None for an empty series.
+    """
+    dates = columns["date"]
+    if len(dates) == 0:
+        return None
+    lines = [f"statistics ({dates[0]}..{dates[-1]}, {len(dates)} trading days)"]
+    lines += _price_lines(dates, columns["close"])
+    lines += _volume_lines(dates, columns["volume"])
+    lines += _market_cap_lines(columns["market_cap"])
+    return "\n".join(lines)
+
+def describe_daily_transaction(rows):
+    """
+    Tool output for daily transactions: precomputed statistics for the analysis, followed by
+    the projected series for the plot data. Statistics use every row, but long series are
+    downsampled with LTTB to SERIES_POINT_BUDGET points, shared by close and volume; market cap
+    moves with the close price. Error payloads pass through.
+    """
+    if not isinstance(rows, list) or rows and is_error_payload(rows):
+        return rows
+    statistics = trend_statistics(columns_from_rows(rows))
+    if statistics is None:
+        return "No daily transactions in the requested period."
+
+    rows = sorted(rows, key=lambda row: row["date"])
+    series = downsample_rows(rows, ["close", "volume"], SERIES_POINT_BUDGET)
+    header = "series:" if len(series) == len(rows) else f"series (downsampled from {len(rows)} to {len(series)} points, shape and extremes kept):"
+    return f"{statistics}\n\n{header}\n{project('get_daily_transaction', series, raw_rows=len(rows))}"
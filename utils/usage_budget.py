@@ -0,0 +1,238 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from agents import Agent, AgentsException, MaxTurnsExceeded, RunHooks, Runner, RunResult, RunResultStreaming
+from agents.items import ToolCallOutputItem
+from agents.run import DEFAULT_MAX_TURNS
+
+from schemas.finance_app import GeneralizedOutput
+from utils.streaming import StreamUpdate, forward_stream_updates
+from utils.model_router import Complexity, route_agent
+from utils.pipeline_cache import mark_incomplete
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per user request limits over all its agent runs, nested ones included; 0 disables a limit
+QUERY_MAX_TURNS = int(os.getenv("QUERY_MAX_TURNS", "40"))
+QUERY_MAX_TOKENS = int(os.getenv("QUERY_MAX_TOKENS", "250000"))
+QUERY_MAX_SECONDS = float(os.getenv("QUERY_MAX_SECONDS", "0"))
+
+@dataclass(frozen=True)
+class Budget:
+    max_turns: int = QUERY_MAX_TURNS
+    max_tokens: int = QUERY_MAX_TOKENS
+    max_seconds: float = QUERY_MAX_SECONDS
+
+class BudgetExceeded(Exception):
+    """Raised to stop an agent run once its request is over budget. Carries the tool outputs gathered so far."""
+
+    def __init__(self, reason: str, tool_outputs: Optional[List[Any]] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.tool_outputs = tool_outputs or []
+
+@dataclass
+class RequestUsage:
+    """LLM usage of one user request, summed over every agent run made for it."""
+    budget: Budget = field(default_factory=Budget)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_turns: int = 0
+    agent_runs: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, turns: int = 0, input_tokens: int = 0, output_tokens: int = 0):
+        with self._lock:
+            self.llm_turns += turns
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def start_run(self):
+        with self._lock:
+            self.agent_runs += 1
+
+    def exceeded(self) -> Optional[str]:
+        """Why the request is over budget, or None."""
+        if self.budget.max_turns and self.llm_turns >= self.budget.max_turns:
+            return f"LLM turn budget of {self.budget.max_turns} reached"
+        if self.budget.max_tokens and self.total_tokens >= self.budget.max_tokens:
+            return f"token budget of {self.budget.max_tokens} reached"
+        if self.budget.max_seconds and time.perf_counter() - self.started >= self.budget.max_seconds:
+            return f"time budget of {self.budget.max_seconds:g}s reached"
+        return None
+
+    def remaining_turns(self) -> int:
+        if not self.budget.max_turns:
+            return DEFAULT_MAX_TURNS
+        return max(0, min(DEFAULT_MAX_TURNS, self.budget.max_turns - self.llm_turns))
+
+    def as_dict(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "llm_turns": self.llm_turns,
+            "agent_runs": self.agent_runs,
+            "seconds": round(time.perf_counter() - self.started, 3),
+        }
+
+_current_usage: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("request_usage", default=None)
+
+def current_usage() -> Optional[RequestUsage]:
+    """The usage of the request being answered, if one is tracked."""
+    return _current_usage.get()
+
+@contextmanager
+def track_usage(budget: Optional[Budget] = None):
+    """
+    Account every run_agent() call made inside the block, including those in tasks it starts,
+    to one RequestUsage and enforce the budget on them. The usage is logged on exit.
+    """
+    usage = RequestUsage(budget=budget or Budget())
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+        logger.info(f"Request usage: {usage.as_dict()}")
+
+class BudgetHooks(RunHooks):
+    """
+    Adds the usage of a run to its request as the run goes, and stops the run at the next tool
+    call or handoff once the request is over budget.
+    """
+
+    def __init__(self, usage: RequestUsage):
+        self.usage = usage
+        self.tool_outputs: List[Any] = []
+        self._seen = (0, 0, 0)
+
+    def sync(self, context):
+        run_usage = context.usage
+        seen = (run_usage.requests, run_usage.input_tokens, run_usage.output_tokens)
+        self.usage.add(*(now - before for now, before in zip(seen, self._seen)))
+        self._seen = seen
+
+    def check(self, context):
+        self.sync(context)
+        reason = self.usage.exceeded()
+        if reason:
+            logger.warning(f"Stopping agent run: {reason} ({self.usage.as_dict()})")
+            raise BudgetExceeded(reason, self.tool_outputs)
+
+    async def on_agent_start(self, context, agent):
+        self.sync(context)
+
+    async def on_agent_end(self, context, agent, output):
+        self.sync(context)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        self.check(context)
+
+    async def on_tool_start(self, context, agent, tool):
+        self.check(context)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        self.tool_outputs.append(result)
+        self.sync(context)
+
+def budget_stop(error: Exception) -> Optional[Exception]:
+    """The BudgetExceeded or MaxTurnsExceeded that stopped a run, or None when it failed for another reason."""
+    if isinstance(error, (BudgetExceeded, MaxTurnsExceeded)):
+        return error
+    # The SDK wraps errors raised while running a tool, our own stop included, in a UserError
+    if isinstance(error, AgentsException) and isinstance(error.__cause__, BudgetExceeded):
+        return error.__cause__
+    return None
+
+def _budgeted(final: bool) -> tuple:
+    """Hooks and max_turns for a run of the current request; raises when no run may start."""
+    usage = current_usage()
+    if usage is None:
+        return None, DEFAULT_MAX_TURNS
+    if not final:
+        reason = usage.exceeded()
+        if reason:
+            raise BudgetExceeded(reason)
+    usage.start_run()
+    # A final answer is a single turn and is always allowed, so the request can end with a summary
+    return BudgetHooks(usage), 1 if final else max(1, usage.remaining_turns())
+
+async def run_agent(agent: Agent, input, final: bool = False, complexity: Optional[Complexity] = None, **kwargs) -> RunResult:
+    """
+    Runner.run on the model tier picked for the input, accounted to the current request and held to its budget.
+    With final=True the run may start over budget; use it for the tool-less summary that ends a request.
+    Pass complexity when it is known better than from the input, e.g. from the plan.
+    """
+    hooks, max_turns = _budgeted(final)
+    agent = route_agent(agent, input, complexity)
+    if hooks is None:
+        return await Runner.run(agent, input, **kwargs)
+    try:
+        result = await Runner.run(agent, input, hooks=hooks, max_turns=max_turns, **kwargs)
+    except AgentsException as e:
+        # e.g. max turns or a guardrail tripwire: the turns made before still count
+        if e.run_data is not None:
+            hooks.sync(e.run_data.context_wrapper)
+        stop = budget_stop(e)
+        if stop is not None and stop is not e:
+            raise stop from None
+        raise
+    hooks.sync(result.context_wrapper)
+    return result
+
+def run_agent_streamed(agent: Agent, input, final: bool = False, complexity: Optional[Complexity] = None,
+                       **kwargs) -> RunResultStreaming:
+    """Routed Runner.run_streamed accounted to the current request; usage is added as the stream is consumed."""
+    hooks, max_turns = _budgeted(final)
+    agent = route_agent(agent, input, complexity)
+    if hooks is None:
+        return Runner.run_streamed(agent, input, **kwargs)
+    return Runner.run_streamed(agent, input, hooks=hooks, max_turns=max_turns, **kwargs)
+
+async def forward_budgeted_stream(result: RunResultStreaming, emit: Callable[[StreamUpdate], None],
+                                  field: str = "summary"):
+    """
+    forward_stream_updates for a run of run_agent_streamed: a run stopped by the budget or its
+    max turns returns partial_output() instead of raising, as run_agent callers do.
+    """
+    try:
+        return await forward_stream_updates(result, emit, field)
+    except Exception as e:
+        stop = budget_stop(e)
+        if stop is None:
+            raise
+        logger.warning(f"Streamed {result.current_agent.name} run stopped early: {stop}")
+        return partial_output(stop)
+
+def partial_output(error: Exception) -> GeneralizedOutput:
+    """
+    Answer of a run stopped by the budget (or by its max turns) built from the tool results it
+    already had, without another LLM call.
+    """
+    if isinstance(error, BudgetExceeded):
+        reason, outputs = error.reason, error.tool_outputs
+    else:
+        run_data = getattr(error, "run_data", None)
+        reason = str(error)
+        outputs = [item.output for item in run_data.new_items if isinstance(item, ToolCallOutputItem)] if run_data else []
+
+    summaries = [str(getattr(output, "summary", output))[:1000] for output in outputs]
+    plot_data = [plot for output in outputs for plot in (getattr(output, "plot_data", None) or [])]
+    mark_incomplete(f"stopped early: {reason}")
+    summary = f"The analysis was stopped early: {reason}."
+    if summaries:
+        summary += " Results gathered so far:\n\n" + "\n\n".join(summaries)
+    return GeneralizedOutput(summary=summary, plot_data=plot_data or None)